@@ -0,0 +1,68 @@
+'''
+compare the index priority queues of stack_queue as the engine of
+DijkstraSP and PrimEagerMst on the same random integer-weighted graphs
+
+    python benchmark_pq.py [V] [E] [max weight]
+'''
+from functools import partial
+import random
+import sys
+import time
+
+from graph import Edge, DirectedEdge, EdgeWeightedGraph, EdgeWeightedDigraph
+from minimum_spanning_tree import PrimEagerMst
+from shortest_path import DijkstraSP
+from stack_queue import (IndexPriorityQueueMin, IndexDaryPriorityQueueMin,
+                         LazyIndexPriorityQueueMin, BucketIndexPriorityQueueMin)
+
+
+def random_graphs(V, E, C, seed=0):
+    rng = random.Random(seed)
+    D = EdgeWeightedDigraph(V)
+    G = EdgeWeightedGraph(V)
+    # a ring keeps every vertex reachable
+    for v in range(V):
+        D.add_edge(DirectedEdge(v, (v + 1) % V, rng.randint(1, C)))
+        G.add_edge(Edge(v, (v + 1) % V, rng.randint(1, C)))
+    for _ in range(E - V):
+        v, w = rng.randrange(V), rng.randrange(V)
+        D.add_edge(DirectedEdge(v, w, rng.randint(1, C)))
+        G.add_edge(Edge(v, w, rng.randint(1, C)))
+    return D, G
+
+
+def timed(f, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = f()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(V=100000, E=500000, C=100):
+    D, G = random_graphs(V, E, C)
+    queues = [
+        ('binary heap', IndexPriorityQueueMin),
+        ('4-ary heap', partial(IndexDaryPriorityQueueMin, d=4)),
+        ('8-ary heap', partial(IndexDaryPriorityQueueMin, d=8)),
+        ('heapq lazy deletion', LazyIndexPriorityQueueMin),
+        ('bucket (Dial)', partial(BucketIndexPriorityQueueMin, C=C)),
+    ]
+    print(f'{V} vertices, {E} edges, integer weights in [1, {C}]')
+    print(f'{"queue":<22}{"dijkstra (s)":>14}{"prim (s)":>12}')
+    reference = None
+    for name, pq_class in queues:
+        t_sp, sp = timed(lambda: DijkstraSP(D, 0, pq_class=pq_class))
+        if reference is None:
+            reference = sp.dist_to
+        assert sp.dist_to == reference, name
+        if isinstance(pq_class, partial) and pq_class.func is BucketIndexPriorityQueueMin:
+            t_mst = '-'  # Prim's keys are edges, not integers
+        else:
+            t_mst = f'{timed(lambda: PrimEagerMst(G, pq_class=pq_class))[0]:.3f}'
+        print(f'{name:<22}{t_sp:>14.3f}{t_mst:>12}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
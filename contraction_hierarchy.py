@@ -0,0 +1,242 @@
+from array import array
+import heapq
+import struct
+
+from stack_queue import Stack, IndexPriorityQueueMin
+from graph import DirectedEdge
+
+
+class ContractionHierarchy:
+    '''
+    contraction hierarchies for point-to-point shortest paths on a static
+    EdgeWeightedDigraph with non-negative weights.
+    preprocessing contracts the vertices one by one, cheapest first by edge
+    difference plus the number of contracted neighbors: a contracted vertex v
+    is removed, and a shortcut u->w of weight d(u, v) + d(v, w) through v is
+    added unless a witness search finds a path from u to w at most as short
+    that avoids v. every vertex keeps its arcs to the vertices contracted
+    after it, so a query only needs two upward searches, one from s over the
+    up arcs and one from t over the down arcs, meeting at the highest vertex
+    of the shortest path
+    '''
+    MAGIC = b'CHINDEX1'
+    _HEADER = struct.Struct('=8sqqq')
+
+    def __init__(self, G=None, witness_limit=64):
+        '''
+        witness_limit bounds the vertices settled by one witness search,
+        a witness missed that way only costs an unneeded shortcut
+        '''
+        self.V = 0
+        self.rank = array('q')
+        # up: arcs v->w, and down: arcs v<-w, both to vertices w of higher rank,
+        # with weight and the contracted middle vertex of a shortcut (-1 otherwise)
+        self.up = None
+        self.down = None
+        if G is not None:
+            self._preprocess(G, witness_limit)
+
+    def _preprocess(self, G, witness_limit):
+        V = G.V
+        self.V = V
+        out = [{} for _ in range(V)]  # out[v][w] = (weight, middle) of the arc v->w
+        inc = [{} for _ in range(V)]  # inc[w][v], the same arc seen from w
+        for e in G.edges():
+            v = e.from_()
+            w = e.to()
+            if v != w and (w not in out[v] or e.weight < out[v][w][0]):
+                out[v][w] = inc[w][v] = (e.weight, -1)
+
+        contracted_neighbors = [0] * V
+        pq = IndexPriorityQueueMin(V)
+        for v in range(V):
+            pq.insert(v, self._priority(v, out, inc, contracted_neighbors, witness_limit))
+        self.rank = array('q', [0] * V)
+        up = [None] * V
+        down = [None] * V
+        order = 0
+        while not pq.is_empty():
+            v = pq.del_min()
+            # lazy update: the priority may have grown since v was queued
+            shortcuts = list(self._shortcuts(v, out, inc, witness_limit))
+            priority = self._priority(v, out, inc, contracted_neighbors, witness_limit, shortcuts)
+            if not pq.is_empty() and priority > pq.min_key():
+                pq.insert(v, priority)
+                continue
+            for u, w, weight in shortcuts:
+                if w not in out[u] or weight < out[u][w][0]:
+                    out[u][w] = inc[w][u] = (weight, v)
+            self.rank[v] = order
+            order += 1
+            up[v] = out[v]
+            down[v] = inc[v]
+            for w in out[v]:
+                del inc[w][v]
+            for u in inc[v]:
+                del out[u][v]
+            for x in set(out[v]) | set(inc[v]):
+                contracted_neighbors[x] += 1
+                pq.change_key(x, self._priority(x, out, inc, contracted_neighbors, witness_limit))
+        self.up = self._csr(up)
+        self.down = self._csr(down)
+
+    def _priority(self, v, out, inc, contracted_neighbors, witness_limit, shortcuts=None):
+        '''
+        edge difference plus contracted neighbors
+        '''
+        if shortcuts is None:
+            shortcuts = list(self._shortcuts(v, out, inc, witness_limit))
+        return len(shortcuts) - len(out[v]) - len(inc[v]) + contracted_neighbors[v]
+
+    def _shortcuts(self, v, out, inc, witness_limit):
+        '''
+        the shortcuts u->w needed when v is contracted
+        '''
+        for u, (uv, _) in inc[v].items():
+            targets = {w: uv + vw for w, (vw, _) in out[v].items() if w != u}
+            if not targets:
+                continue
+            dist = self._witness(u, v, out, max(targets.values()), witness_limit)
+            for w, weight in targets.items():
+                if dist.get(w, float("inf")) > weight:
+                    yield u, w, weight
+
+    def _witness(self, s, skip, out, limit, witness_limit):
+        '''
+        distances from s found by a Dijkstra search avoiding skip,
+        stopped past limit or after witness_limit settled vertices
+        '''
+        dist = {s: 0.}
+        pq = [(0., s)]
+        settled = 0
+        while pq and settled < witness_limit:
+            d, v = heapq.heappop(pq)
+            if d > dist[v]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for w, (weight, _) in out[v].items():
+                if w != skip and d + weight < dist.get(w, float("inf")):
+                    dist[w] = d + weight
+                    heapq.heappush(pq, (d + weight, w))
+        return dist
+
+    def _csr(self, arcs):
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = array('d')
+        middles = array('q')
+        for v in range(self.V):
+            for w, (weight, middle) in sorted(arcs[v].items()):
+                targets.append(w)
+                weights.append(weight)
+                middles.append(middle)
+            offsets.append(len(targets))
+        return offsets, targets, weights, middles
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self._HEADER.pack(self.MAGIC, self.V, len(self.up[1]), len(self.down[1])))
+            self.rank.tofile(f)
+            for part in self.up + self.down:
+                part.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        ch = cls()
+        with open(path, 'rb') as f:
+            magic, V, n_up, n_down = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            if magic != cls.MAGIC:
+                raise ValueError(f"{path} is not a contraction hierarchy index")
+            ch.V = V
+            ch.rank.fromfile(f, V)
+            for n, name in ((n_up, 'up'), (n_down, 'down')):
+                part = []
+                for typecode, size in (('q', V + 1), ('q', n), ('d', n), ('q', n)):
+                    a = array(typecode)
+                    a.fromfile(f, size)
+                    part.append(a)
+                setattr(ch, name, tuple(part))
+        return ch
+
+    def query(self, s, t):
+        '''
+        return the distance from s to t and the path as a Stack of the original
+        DirectedEdges with the first edge on top, like ShortestPath.path_to;
+        (inf, None) when t is not reachable
+        '''
+        if s == t:
+            return 0., Stack()
+        dist = ({s: 0.}, {t: 0.})
+        parent = ({s: None}, {t: None})
+        pqs = ([(0., s)], [(0., t)])
+        arcs = (self.up, self.down)
+        best = float("inf")
+        meet = None
+        side = 0
+        while pqs[0] or pqs[1]:
+            if not pqs[side]:
+                side = 1 - side
+            d, v = heapq.heappop(pqs[side])
+            if d > dist[side][v]:
+                continue
+            if d >= best:
+                pqs[side].clear()  # nothing shorter left on this side
+                continue
+            if v in dist[1 - side] and d + dist[1 - side][v] < best:
+                best = d + dist[1 - side][v]
+                meet = v
+            offsets, targets, weights, middles = arcs[side]
+            for i in range(offsets[v], offsets[v + 1]):
+                w = targets[i]
+                if d + weights[i] < dist[side].get(w, float("inf")):
+                    dist[side][w] = d + weights[i]
+                    parent[side][w] = (v, i)
+                    heapq.heappush(pqs[side], (d + weights[i], w))
+            side = 1 - side
+        if meet is None:
+            return float("inf"), None
+        return best, self._path(meet, parent)
+
+    def _path(self, meet, parent):
+        # arcs of the path in order, as (tail, head, weight, middle)
+        arcs = []
+        v = meet
+        while parent[0][v] is not None:
+            u, i = parent[0][v]
+            arcs.append((u, v, self.up[2][i], self.up[3][i]))
+            v = u
+        arcs.reverse()
+        v = meet
+        while parent[1][v] is not None:
+            w, i = parent[1][v]
+            arcs.append((v, w, self.down[2][i], self.down[3][i]))
+            v = w
+        # unpack the shortcuts, the next arc on top of the stack
+        edges = []
+        todo = arcs[::-1]
+        while todo:
+            v, w, weight, middle = todo.pop()
+            if middle == -1:
+                edges.append(DirectedEdge(v, w, weight))
+            else:
+                todo.append(self._arc(self.up, middle, w))
+                todo.append(self._arc(self.down, middle, v))
+        path = Stack()
+        for e in reversed(edges):
+            path.push(e)
+        return path
+
+    def _arc(self, arcs, v, w):
+        '''
+        the arc between v and a higher vertex w, as (tail, head, weight, middle)
+        in the direction of travel
+        '''
+        offsets, targets, weights, middles = arcs
+        for i in range(offsets[v], offsets[v + 1]):
+            if targets[i] == w:
+                if arcs is self.up:
+                    return v, w, weights[i], middles[i]
+                return w, v, weights[i], middles[i]
+        raise RuntimeError(f"arc between {v} and {w} missing from the index")
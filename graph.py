@@ -1,14 +1,61 @@
+from array import array
+from bisect import bisect_right
+from operator import attrgetter
+import sys
+
+
+def _tolist(a):
+    '''
+    NumPy arrays and array.array iterate much faster once turned into a list
+    of Python ints; any other iterable is passed through untouched
+    '''
+    return a.tolist() if hasattr(a, 'tolist') else a
+
+
+def _sorted_ids(ids, weight):
+    '''
+    array of the edge ids in ids, stably sorted by weight[id]
+    '''
+    return array('q', sorted(ids, key=weight.__getitem__))
+
+
 class Graph:
     def __init__(self, V):
         self.V = V
         self.E = 0
         self.adj = [[] for _ in range(V)]
 
+    def add_vertex(self):
+        self.adj.append([])
+        self.V += 1
+        return self.V - 1
+
     def add_edge(self, v, w):
         self.adj[v].append(w)
         self.adj[w].append(v)
         self.E += 1
 
+    def add_edges_from(self, edges):
+        '''
+        add every pair (v, w) of an iterable, which may be a streaming iterator
+        '''
+        adj = self.adj
+        n = 0
+        for v, w in edges:
+            adj[v].append(w)
+            adj[w].append(v)
+            n += 1
+        self.E += n
+
+    @classmethod
+    def from_edge_array(cls, V, src, dst):
+        '''
+        build a graph from the parallel arrays of edges src[i]-dst[i]
+        '''
+        G = cls(V)
+        G.add_edges_from(zip(_tolist(src), _tolist(dst)))
+        return G
+
     def __str__(self):
         s = f'{self.V} vertices, {self.E} edges\n'
         for v in range(self.V):
@@ -24,17 +71,189 @@ class Digraph:
         self.V = V
         self.E = 0
         self.adj = [[] for _ in range(V)]  # should have used a list of bags
+        self._reverse = None  # built by reverse(), then kept in sync by every update
+
+    def add_vertex(self):
+        self.adj.append([])
+        self.V += 1
+        if self._reverse is not None:
+            self._reverse.add_vertex()
+        return self.V - 1
 
     def add_edge(self, v, w):
         self.adj[v].append(w)
         self.E += 1
+        if self._reverse is not None:
+            self._reverse.add_edge(w, v)
+
+    def add_edges_from(self, edges):
+        '''
+        add every pair (v, w) of an iterable, which may be a streaming iterator
+        '''
+        if self._reverse is not None:
+            self._reverse.add_edges_from(self._mirror(edges))
+            return
+        adj = self.adj
+        n = 0
+        for v, w in edges:
+            adj[v].append(w)
+            n += 1
+        self.E += n
+
+    def _mirror(self, edges):
+        '''
+        add the edges to self while handing them reversed to the reverse digraph
+        '''
+        adj = self.adj
+        for v, w in edges:
+            adj[v].append(w)
+            self.E += 1
+            yield w, v
+
+    @classmethod
+    def from_edge_array(cls, V, src, dst):
+        '''
+        build a digraph from the parallel arrays of edges src[i]->dst[i]
+        '''
+        G = cls(V)
+        G.add_edges_from(zip(_tolist(src), _tolist(dst)))
+        return G
 
     def reverse(self):
-        R = Digraph(self.V)
+        '''
+        the reverse digraph is built on the first call only and then updated
+        along with self, so it is shared and must not be modified by callers
+        '''
+        if self._reverse is None:
+            R = Digraph(self.V)
+            R.add_edges_from((w, v) for v in range(self.V) for w in self.adj[v])
+            self._reverse = R
+        return self._reverse
+
+    def __str__(self):
+        s = f'{self.V} vertices, {self.E} edges\n'
         for v in range(self.V):
+            s += str(v) + ' -> '
             for w in self.adj[v]:
-                R.add_edge(w, v)
-        return R
+                s += str(w) + ' '
+            s += '\n'
+        return s
+
+
+def _csr_arrays(V, src, dst, directed, weight=None):
+    '''
+    counting sort of the edges src[i]-dst[i] (of weight[i]) by tail vertex;
+    the fill is stable, so every adj[v] keeps the order in which add_edge()
+    would have appended to it
+    '''
+    offsets = array('q', bytes(8 * (V + 1)))
+    for v in src:
+        offsets[v + 1] += 1
+    if not directed:
+        for w in dst:
+            offsets[w + 1] += 1
+    for v in range(V):
+        offsets[v + 1] += offsets[v]
+    targets = array('q', bytes(8 * offsets[V]))
+    weights = None if weight is None else array('d', bytes(8 * offsets[V]))
+    position = offsets[:-1]  # next free slot of each vertex
+    for i, (v, w) in enumerate(zip(src, dst)):
+        targets[position[v]] = w
+        if weights is not None:
+            weights[position[v]] = weight[i]
+        position[v] += 1
+        if not directed:
+            targets[position[w]] = v
+            if weights is not None:
+                weights[position[w]] = weight[i]
+            position[w] += 1
+    return offsets, targets, weights
+
+
+class CSRAdjacency:
+    '''
+    read-only view standing in for the list of lists adj[],
+    adj[v] is a zero-copy slice of the flat targets array
+    '''
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = memoryview(targets)
+
+    def __getitem__(self, v):
+        return self.targets[self.offsets[v]:self.offsets[v + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for v in range(len(self)):
+            yield self[v]
+
+
+class CSRGraph:
+    '''
+    frozen compressed sparse row version of Graph,
+    the neighbors of v are targets[offsets[v]:offsets[v+1]]
+    '''
+    directed = False
+
+    def __init__(self, V, offsets, targets):
+        self.V = V
+        self.offsets = offsets
+        self.targets = targets
+        self.E = len(targets) if self.directed else len(targets) // 2
+        self.adj = CSRAdjacency(offsets, targets)
+
+    @classmethod
+    def from_graph(cls, G):
+        offsets = array('q', [0])
+        targets = array('q')
+        for v in range(G.V):
+            targets.extend(G.adj[v])
+            offsets.append(len(targets))
+        return cls(G.V, offsets, targets)
+
+    @classmethod
+    def from_edges(cls, V, src, dst):
+        '''
+        build from the parallel arrays of edges src[i]-dst[i]
+        '''
+        offsets, targets, _ = _csr_arrays(V, _tolist(src), _tolist(dst), cls.directed)
+        return cls(V, offsets, targets)
+
+    def degree(self, v):
+        return self.offsets[v + 1] - self.offsets[v]
+
+    def __str__(self):
+        s = f'{self.V} vertices, {self.E} edges\n'
+        for v in range(self.V):
+            s += str(v) + ': '
+            for w in self.adj[v]:
+                s += str(w) + ' '
+            s += '\n'
+        return s
+
+
+class CSRDigraph(CSRGraph):
+    '''
+    frozen compressed sparse row version of Digraph
+    '''
+    directed = True
+    _reverse = None
+
+    def reverse(self):
+        '''
+        transpose computed once by a counting sort of the edges by head,
+        a frozen graph never invalidates it
+        '''
+        if self._reverse is None:
+            sources = array('q')
+            for v in range(self.V):
+                sources.extend([v] * self.degree(v))
+            offsets, targets, _ = _csr_arrays(self.V, self.targets, sources, True)
+            self._reverse = CSRDigraph(self.V, offsets, targets)
+            self._reverse._reverse = self
+        return self._reverse
 
     def __str__(self):
         s = f'{self.V} vertices, {self.E} edges\n'
@@ -46,15 +265,77 @@ class Digraph:
         return s
 
 
-class SymbolGraph(Graph):
-    def __init__(self, keys):
+class SymbolTable:
+    '''
+    incremental symbol table, each new name gets the next id in order
+    of first appearance; string names are interned and kept in one list
+    '''
+    def __init__(self, keys=()):
+        self.keys = []  # keys[i] is the name of vertex i
+        self.st = {}  # name -> vertex
+        for key in keys:
+            self.intern(key)
+
+    def intern(self, key):
+        '''
+        return the id of key, assigning the next one if key is new
+        '''
+        i = self.st.get(key)
+        if i is None:
+            if isinstance(key, str):
+                key = sys.intern(key)
+            i = len(self.keys)
+            self.keys.append(key)
+            self.st[key] = i
+        return i
+
+    def index(self, key):
+        return self.st.get(key)
+
+    def name(self, i):
+        return self.keys[i]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def save(self, path):
+        '''
+        write the names one per line, in id order; only string names
+        without line breaks survive that, so any other name is rejected
+        '''
+        for key in self.keys:
+            if not isinstance(key, str) or '\n' in key or '\r' in key:
+                raise ValueError(f"cannot save {key!r}, names must be strings without line breaks")
+        with open(path, 'w', encoding='utf-8') as f:
+            for key in self.keys:
+                f.write(f'{key}\n')
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(line.rstrip('\n') for line in f)
+
+
+class _SymbolGraphBase:
+    '''
+    vertices are named, and edges between new names grow the graph
+    one vertex at a time, so an edge list can be streamed in a single pass
+    '''
+    def __init__(self, keys=(), symbols=None):
+        self.symbols = SymbolTable(keys) if symbols is None else symbols
+        self.keys = self.symbols.keys
+        self.st = self.symbols.st  # symbol table
+        super().__init__(len(self.symbols))
+
+    @classmethod
+    def read(cls, path, sep=None, symbols=None):
         '''
-        For symbol digraph, the implementation is similar
+        stream the edges of a file holding two names per line
         '''
-        self.keys = list(set(keys))
-        self.V = len(self.keys)
-        self.st = {self.keys[i]: i for i in range(self.V)}  # symbol table
-        super().__init__(self.V)
+        G = cls(symbols=symbols)
+        with open(path, encoding='utf-8') as f:
+            G.add_edges_from(line.rstrip('\r\n').split(sep) for line in f if line.strip())
+        return G
 
     def index(self, key):
         return self.st.get(key)
@@ -62,13 +343,27 @@ class SymbolGraph(Graph):
     def name(self, i):
         return self.keys[i]
 
+    def vertex(self, key):
+        '''
+        the vertex named key, added to the graph if key is new
+        '''
+        i = self.symbols.intern(key)
+        while self.V <= i:
+            self.add_vertex()
+        return i
+
     def add_edge(self, v, w):
-        v = self.index(v)
-        w = self.index(w)
-        self.adj[v].append(w)
-        self.adj[w].append(v)
-        self.E += 1
+        super().add_edge(self.vertex(v), self.vertex(w))
+
+    def add_edges_from(self, edges):
+        vertex = self.vertex
+        super().add_edges_from((vertex(v), vertex(w)) for v, w in edges)
+
+    def save_symbols(self, path):
+        self.symbols.save(path)
+
 
+class SymbolGraph(_SymbolGraphBase, Graph):
     def __str__(self):
         s = f'{self.V} vertices, {self.E} edges\n'
         for v in range(self.V):
@@ -79,7 +374,20 @@ class SymbolGraph(Graph):
         return s
 
 
+class SymbolDigraph(_SymbolGraphBase, Digraph):
+    def __str__(self):
+        s = f'{self.V} vertices, {self.E} edges\n'
+        for v in range(self.V):
+            s += str(self.name(v)) + ' -> '
+            for w in self.adj[v]:
+                s += str(self.name(w)) + ' '
+            s += '\n'
+        return s
+
+
 class Edge:
+    __slots__ = ('v', 'w', 'weight')
+
     def __init__(self, v, w, weight):
         self.v = v
         self.w = w
@@ -109,6 +417,8 @@ class EdgeWeightedGraph:
         self.V = V
         self.adj = [[] for _ in range(V)]
         self.E = 0
+        self.version = 0  # bumped by every change, invalidates derived data
+        self._sorted = None
 
     def add_edge(self, e):
         v = e.either()
@@ -116,14 +426,48 @@ class EdgeWeightedGraph:
         self.adj[v].append(e)
         self.adj[w].append(e)
         self.E += 1
+        self.version += 1
+
+    def add_edges_from(self, edges):
+        '''
+        add every Edge of an iterable, which may be a streaming iterator
+        '''
+        adj = self.adj
+        n = 0
+        for e in edges:
+            v = e.either()
+            adj[v].append(e)
+            adj[e.other(v)].append(e)
+            n += 1
+        self.E += n
+        self.version += 1
+
+    @classmethod
+    def from_edge_array(cls, V, src, dst, weight):
+        '''
+        build a graph from the parallel arrays of edges src[i]-dst[i] of weight[i]
+        '''
+        G = cls(V)
+        G.add_edges_from(map(Edge, _tolist(src), _tolist(dst), _tolist(weight)))
+        return G
 
     def edges(self):
-        edges = []
+        '''
+        lazily iterate over every edge once
+        '''
         for v in range(self.V):
             for e in self.adj[v]:
                 if e.other(v) > v:
-                    edges.append(e)
-        return edges
+                    yield e
+
+    def sorted_edges(self):
+        '''
+        the edges in ascending order of weight, sorted once and
+        reused until the graph changes
+        '''
+        if self._sorted is None or self._sorted[0] != self.version:
+            self._sorted = (self.version, sorted(self.edges(), key=attrgetter('weight')))
+        return self._sorted[1]
 
     def __str__(self):
         s = f'{self.V} vertices, {self.E} edges\n'
@@ -136,6 +480,8 @@ class EdgeWeightedGraph:
 
 
 class DirectedEdge:
+    __slots__ = ('v', 'w', 'weight')
+
     def __init__(self, v, w, weight):
         self.v = v
         self.w = w
@@ -162,17 +508,443 @@ class EdgeWeightedDigraph:
         self.V = V
         self.adj = [[] for _ in range(V)]
         self.E = 0
+        self.version = 0  # bumped by every change, invalidates derived data
+        self._sorted = None
+        self._radj = None  # built by reverse_adj(), then kept in sync by every update
 
     def add_edge(self, e):
         self.adj[e.from_()].append(e)
         self.E += 1
+        self.version += 1
+        if self._radj is not None:
+            self._radj[e.to()].append(e)
+
+    def add_edges_from(self, edges):
+        '''
+        add every DirectedEdge of an iterable, which may be a streaming iterator
+        '''
+        adj = self.adj
+        radj = self._radj
+        n = 0
+        for e in edges:
+            adj[e.from_()].append(e)
+            if radj is not None:
+                radj[e.to()].append(e)
+            n += 1
+        self.E += n
+        self.version += 1
+
+    @classmethod
+    def from_edge_array(cls, V, src, dst, weight):
+        '''
+        build a digraph from the parallel arrays of edges src[i]->dst[i] of weight[i]
+        '''
+        G = cls(V)
+        G.add_edges_from(map(DirectedEdge, _tolist(src), _tolist(dst), _tolist(weight)))
+        return G
+
+    def remove_edge(self, e):
+        '''
+        remove the edge object e itself, not just an edge equal to it
+        '''
+        lists = [self.adj[e.from_()]]
+        if self._radj is not None:
+            lists.append(self._radj[e.to()])
+        for edges in lists:
+            for i, x in enumerate(edges):
+                if x is e:
+                    del edges[i]
+                    break
+            else:
+                raise ValueError(f"edge {e} is not in the digraph")
+        self.E -= 1
+        self.version += 1
+
+    def set_weight(self, e, weight):
+        '''
+        change the weight of the edge e of this digraph
+        '''
+        e.weight = weight
+        self.version += 1
 
     def edges(self):
-        edges = []
+        '''
+        lazily iterate over every edge
+        '''
+        for v in range(self.V):
+            yield from self.adj[v]
+
+    def reverse_adj(self):
+        '''
+        radj[w] lists the edges pointing to w, built on the first call only
+        and then updated along with self, so it must not be modified by callers
+        '''
+        if self._radj is None:
+            self._radj = _in_edges(self)
+        return self._radj
+
+    def sorted_edges(self):
+        '''
+        the edges in ascending order of weight, sorted once and
+        reused until the graph changes
+        '''
+        if self._sorted is None or self._sorted[0] != self.version:
+            self._sorted = (self.version, sorted(self.edges(), key=attrgetter('weight')))
+        return self._sorted[1]
+
+    def __str__(self):
+        s = f'{self.V} vertices, {self.E} edges\n'
         for v in range(self.V):
+            s += f'{v}: '
             for e in self.adj[v]:
-                edges.append(e)
-        return edges
+                s += f'{e}, '
+            s += '\n'
+        return s.strip()
+
+
+def _in_edges(G):
+    radj = [[] for _ in range(G.V)]
+    for e in G.edges():
+        radj[e.to()].append(e)
+    return radj
+
+
+class EdgeStore:
+    '''
+    struct-of-arrays edge list addressed by integer id,
+    edge i is v[i]-w[i] of weight[i] and store[i] materializes it
+    as an Edge (a DirectedEdge for a directed store)
+    '''
+    def __init__(self, directed=False):
+        self.v = array('q')
+        self.w = array('q')
+        self.weight = array('d')
+        self.edge_class = DirectedEdge if directed else Edge
+
+    def append(self, v, w, weight):
+        '''
+        add the edge v-w and return its id
+        '''
+        self.v.append(v)
+        self.w.append(w)
+        self.weight.append(weight)
+        return len(self.v) - 1
+
+    def __getitem__(self, i):
+        return self.edge_class(self.v[i], self.w[i], self.weight[i])
+
+    def __len__(self):
+        return len(self.v)
+
+    def __iter__(self):
+        return map(self.edge_class, self.v, self.w, self.weight)
+
+
+class EdgeIdAdjacency:
+    '''
+    read-only view standing in for the list of lists of edges adj[],
+    ids[v] holds the ids of the edges incident to v and adj[v]
+    materializes them from the edge store on demand
+    '''
+    def __init__(self, ids, store):
+        self.ids = ids
+        self.store = store
+
+    def __getitem__(self, v):
+        store = self.store
+        return [store[i] for i in self.ids[v]]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for v in range(len(self)):
+            yield self[v]
+
+
+class _SortedEdgeIds:
+    '''
+    sorted_edge_ids() and sorted_edges() for a graph giving its edge ids
+    through _edge_ids(), their weights through _edge_weights() and the edge
+    of an id through edge()
+    '''
+    def sorted_edge_ids(self):
+        '''
+        array of the edge ids in ascending order of weight,
+        sorted once and reused until the graph changes
+        '''
+        if self._sorted is None or self._sorted[0] != self.version:
+            self._sorted = (self.version, _sorted_ids(self._edge_ids(), self._edge_weights()))
+        return self._sorted[1]
+
+    def sorted_edges(self):
+        '''
+        lazily iterate over the edges in ascending order of weight, only the
+        sorted ids are kept and every edge is materialized when it is reached
+        '''
+        return map(self.edge, self.sorted_edge_ids())
+
+
+class _EdgeStoreMixin(_SortedEdgeIds):
+    '''
+    the methods shared by the graphs keeping their edges in an EdgeStore
+    '''
+    def add_edges_from(self, edges):
+        for e in edges:
+            self.add_edge(e)
+
+    def edge(self, i):
+        return self.store[i]
+
+    def edges(self):
+        return iter(self.store)
+
+    def _edge_ids(self):
+        return range(len(self.store))
+
+    def _edge_weights(self):
+        return self.store.weight
+
+
+class CompactEdgeWeightedGraph(_EdgeStoreMixin, EdgeWeightedGraph):
+    '''
+    EdgeWeightedGraph keeping its edges in an EdgeStore,
+    each vertex only holds an array of edge ids
+    '''
+    def __init__(self, V):
+        self.V = V
+        self.E = 0
+        self.version = 0
+        self._sorted = None
+        self.store = EdgeStore()
+        self.ids = [array('q') for _ in range(V)]
+        self.adj = EdgeIdAdjacency(self.ids, self.store)
+
+    def add(self, v, w, weight):
+        i = self.store.append(v, w, weight)
+        self.ids[v].append(i)
+        self.ids[w].append(i)
+        self.E += 1
+        self.version += 1
+        return i
+
+    def add_edge(self, e):
+        v = e.either()
+        return self.add(v, e.other(v), e.weight)
+
+    @classmethod
+    def from_edge_array(cls, V, src, dst, weight):
+        G = cls(V)
+        G.store.v.extend(_tolist(src))
+        G.store.w.extend(_tolist(dst))
+        G.store.weight.extend(_tolist(weight))
+        for i, (v, w) in enumerate(zip(G.store.v, G.store.w)):
+            G.ids[v].append(i)
+            G.ids[w].append(i)
+        G.E = len(G.store)
+        return G
+
+
+class CompactEdgeWeightedDigraph(_EdgeStoreMixin, EdgeWeightedDigraph):
+    '''
+    EdgeWeightedDigraph keeping its edges in an EdgeStore,
+    each vertex only holds an array of the ids of the edges leaving it
+    '''
+    def __init__(self, V):
+        self.V = V
+        self.E = 0
+        self.version = 0
+        self._sorted = None
+        self._radj = None
+        self.store = EdgeStore(directed=True)
+        self.ids = [array('q') for _ in range(V)]
+        self.adj = EdgeIdAdjacency(self.ids, self.store)
+
+    def add(self, v, w, weight):
+        i = self.store.append(v, w, weight)
+        self.ids[v].append(i)
+        self.E += 1
+        self.version += 1
+        if self._radj is not None:
+            self._radj[w].append(self.store[i])
+        return i
+
+    def add_edge(self, e):
+        return self.add(e.from_(), e.to(), e.weight)
+
+    def _edge_id(self, e):
+        '''
+        the id of an edge of this digraph equal to e; adj[] materializes new
+        edge objects on every access, so edges are matched by value, not identity
+        '''
+        store = self.store
+        w = e.to()
+        for i in self.ids[e.from_()]:
+            if store.w[i] == w and store.weight[i] == e.weight:
+                return i
+        raise ValueError(f"edge {e} is not in the digraph")
+
+    def _radj_entry(self, v, w, weight):
+        for i, x in enumerate(self._radj[w]):
+            if x.from_() == v and x.weight == weight:
+                return i
+        raise RuntimeError(f"reverse adjacency of {w} out of sync")
+
+    def remove(self, i):
+        '''
+        remove the edge with id i; the last edge of the store moves into
+        its slot and takes over id i, which keeps the store dense
+        '''
+        store = self.store
+        v, w, weight = store.v[i], store.w[i], store.weight[i]
+        ids = self.ids[v]
+        del ids[ids.index(i)]
+        if self._radj is not None:
+            del self._radj[w][self._radj_entry(v, w, weight)]
+        last = len(store) - 1
+        if i != last:
+            store.v[i] = store.v[last]
+            store.w[i] = store.w[last]
+            store.weight[i] = store.weight[last]
+            ids = self.ids[store.v[last]]
+            ids[ids.index(last)] = i
+        for a in (store.v, store.w, store.weight):
+            a.pop()
+        self.E -= 1
+        self.version += 1
+
+    def remove_edge(self, e):
+        '''
+        remove an edge equal to e
+        '''
+        self.remove(self._edge_id(e))
+
+    def set_weight(self, e, weight):
+        '''
+        change the weight of the edge of this digraph equal to e, and of e itself
+        '''
+        i = self._edge_id(e)
+        if self._radj is not None:
+            # a new copy, the old one may be held by a caller as well
+            v, w = e.from_(), e.to()
+            self._radj[w][self._radj_entry(v, w, e.weight)] = self.store.edge_class(v, w, weight)
+        self.store.weight[i] = weight
+        e.weight = weight
+        self.version += 1
+
+    @classmethod
+    def from_edge_array(cls, V, src, dst, weight):
+        G = cls(V)
+        G.store.v.extend(_tolist(src))
+        G.store.w.extend(_tolist(dst))
+        G.store.weight.extend(_tolist(weight))
+        for i, v in enumerate(G.store.v):
+            G.ids[v].append(i)
+        G.E = len(G.store)
+        return G
+
+
+class CSREdgeAdjacency:
+    '''
+    read-only view standing in for the list of lists of edges adj[],
+    adj[v] materializes the edges out of v from the flat arrays on demand;
+    with inbound=True the flat arrays hold the tails of the edges into v
+    and adj[v] materializes those
+    '''
+    def __init__(self, offsets, targets, weights, edge_class, inbound=False):
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_class = edge_class
+        self.inbound = inbound
+
+    def __getitem__(self, v):
+        lo = self.offsets[v]
+        hi = self.offsets[v + 1]
+        edge = self.edge_class
+        if self.inbound:
+            return [edge(u, v, weight) for u, weight in zip(self.targets[lo:hi], self.weights[lo:hi])]
+        return [edge(v, w, weight) for w, weight in zip(self.targets[lo:hi], self.weights[lo:hi])]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for v in range(len(self)):
+            yield self[v]
+
+
+class CSREdgeWeightedGraph(_SortedEdgeIds):
+    '''
+    frozen compressed sparse row version of EdgeWeightedGraph,
+    the edges out of v are to targets[offsets[v]:offsets[v+1]] with the
+    parallel weights, and each undirected edge is stored once in each direction
+    '''
+    directed = False
+    edge_class = Edge
+
+    def __init__(self, V, offsets, targets, weights):
+        self.V = V
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.E = len(targets) if self.directed else len(targets) // 2
+        self.adj = CSREdgeAdjacency(offsets, targets, weights, self.edge_class)
+        self.version = 0  # frozen
+        self._sorted = None
+
+    @classmethod
+    def from_graph(cls, G):
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = array('d')
+        for v in range(G.V):
+            for e in G.adj[v]:
+                targets.append(e.to() if cls.directed else e.other(v))
+                weights.append(e.weight)
+            offsets.append(len(targets))
+        return cls(G.V, offsets, targets, weights)
+
+    @classmethod
+    def from_edges(cls, V, src, dst, weight):
+        '''
+        build from the parallel arrays of edges src[i]-dst[i] of weight[i]
+        '''
+        offsets, targets, weights = _csr_arrays(V, _tolist(src), _tolist(dst), cls.directed, _tolist(weight))
+        return cls(V, offsets, targets, weights)
+
+    def degree(self, v):
+        return self.offsets[v + 1] - self.offsets[v]
+
+    def edges(self):
+        '''
+        lazily iterate over every edge once
+        '''
+        edge = self.edge_class
+        for v in range(self.V):
+            for i in range(self.offsets[v], self.offsets[v + 1]):
+                w = self.targets[i]
+                if w > v:
+                    yield edge(v, w, self.weights[i])
+
+    def _edge_ids(self):
+        '''
+        the positions in targets holding one direction of every edge
+        '''
+        for v in range(self.V):
+            for i in range(self.offsets[v], self.offsets[v + 1]):
+                if self.targets[i] > v:
+                    yield i
+
+    def edge(self, i):
+        '''
+        the edge stored at position i of targets
+        '''
+        v = bisect_right(self.offsets, i) - 1
+        return self.edge_class(v, self.targets[i], self.weights[i])
+
+    def _edge_weights(self):
+        return self.weights
 
     def __str__(self):
         s = f'{self.V} vertices, {self.E} edges\n'
@@ -182,3 +954,60 @@ class EdgeWeightedDigraph:
                 s += f'{e}, '
             s += '\n'
         return s.strip()
+
+
+class CSREdgeWeightedDigraph(CSREdgeWeightedGraph):
+    '''
+    frozen compressed sparse row version of EdgeWeightedDigraph
+    '''
+    directed = True
+    edge_class = DirectedEdge
+    _radj = None
+
+    def reverse_adj(self):
+        '''
+        radj[w] lists the edges pointing to w. the transpose is computed once
+        as flat arrays by a counting sort of the edges by head, as in
+        CSRDigraph.reverse, and the edges are only materialized per radj[w]
+        '''
+        if self._radj is None:
+            sources = array('q')
+            for v in range(self.V):
+                sources.extend([v] * self.degree(v))
+            offsets, tails, weights = _csr_arrays(self.V, self.targets, sources, True, self.weights)
+            self._radj = CSREdgeAdjacency(offsets, tails, weights, self.edge_class, inbound=True)
+        return self._radj
+
+    def edges(self):
+        '''
+        lazily iterate over every edge
+        '''
+        edge = self.edge_class
+        for v in range(self.V):
+            for i in range(self.offsets[v], self.offsets[v + 1]):
+                yield edge(v, self.targets[i], self.weights[i])
+
+    def _edge_ids(self):
+        return range(len(self.targets))
+
+
+def edge_arrays(G):
+    '''
+    the edges of a weighted graph as parallel arrays (v, w, weight),
+    the i-th entries describe the i-th edge of G.edges()
+    '''
+    if hasattr(G, 'store'):
+        return G.store.v, G.store.w, G.store.weight
+    if isinstance(G, CSREdgeWeightedDigraph):
+        v = array('q')
+        for u in range(G.V):
+            v.extend([u] * G.degree(u))
+        return v, G.targets, G.weights
+    v = array('q')
+    w = array('q')
+    weight = array('d')
+    for e in G.edges():
+        v.append(e.v)
+        w.append(e.w)
+        weight.append(e.weight)
+    return v, w, weight
@@ -0,0 +1,77 @@
+'''
+binary CSR graph file, in native byte order:
+    header   magic, version, flags, V, n (the number of adjacency entries)
+    offsets  V + 1 int64
+    targets  n int64
+    weights  n float64, only for weighted graphs
+every section is 8-byte aligned, so an opened file is used in place
+'''
+
+import mmap
+import struct
+
+from graph import Graph, Digraph, EdgeWeightedGraph, EdgeWeightedDigraph
+from graph import CSRGraph, CSRDigraph, CSREdgeWeightedGraph, CSREdgeWeightedDigraph
+
+MAGIC = b'CSRGRAPH'
+VERSION = 1
+DIRECTED = 1
+WEIGHTED = 2
+_HEADER = struct.Struct('=8sIIqq')
+
+_CLASSES = {
+    0: CSRGraph,
+    DIRECTED: CSRDigraph,
+    WEIGHTED: CSREdgeWeightedGraph,
+    DIRECTED | WEIGHTED: CSREdgeWeightedDigraph,
+}
+_CSR_CLASSES = [
+    (Graph, CSRGraph),
+    (Digraph, CSRDigraph),
+    (EdgeWeightedGraph, CSREdgeWeightedGraph),
+    (EdgeWeightedDigraph, CSREdgeWeightedDigraph),
+]
+
+
+def save_graph(G, path):
+    '''
+    write G, either a CSR graph or one of the list based graphs, to path
+    '''
+    if not hasattr(G, 'offsets'):
+        for graph_class, csr_class in _CSR_CLASSES:
+            if isinstance(G, graph_class):
+                G = csr_class.from_graph(G)
+                break
+        else:
+            raise TypeError(f"cannot save a graph of type {type(G).__name__}")
+    flags = (DIRECTED if G.directed else 0) | (WEIGHTED if hasattr(G, 'weights') else 0)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, flags, G.V, len(G.targets)))
+        f.write(memoryview(G.offsets).cast('B'))
+        f.write(memoryview(G.targets).cast('B'))
+        if flags & WEIGHTED:
+            f.write(memoryview(G.weights).cast('B'))
+
+
+def open_graph(path):
+    '''
+    map the file at path into memory and return the CSR graph reading from it,
+    the pages are loaded lazily and shared among all processes opening the file
+    '''
+    with open(path, 'rb') as f:
+        buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    magic, version, flags, V, n = _HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a CSR graph file")
+    start = _HEADER.size
+    offsets = buf[start:start + 8 * (V + 1)].cast('q')
+    start += 8 * (V + 1)
+    targets = buf[start:start + 8 * n].cast('q')
+    start += 8 * n
+    if flags & WEIGHTED:
+        weights = buf[start:start + 8 * n].cast('d')
+        G = _CLASSES[flags](V, offsets, targets, weights)
+    else:
+        G = _CLASSES[flags](V, offsets, targets)
+    G.path = path  # lets other processes map the same file
+    return G
@@ -1,4 +1,93 @@
+from itertools import chain
+from multiprocessing import Pool
+import os
+
 from stack_queue import Stack, Queue
+from graph import Digraph, CSRGraph, CSRDigraph
+from union_find import ArrayUnionFind
+
+
+def depth_first(adj, s, marked, pre=None, post=None, tree_edge=None, non_tree_edge=None, to=None,
+                edge_to=None, ID=None, label=None):
+    '''
+    iterative depth-first search from s over the vertices not yet marked,
+    using an explicit stack of neighbor iterators instead of recursion,
+    so the visiting order is exactly the one of the recursive version.
+    pre(v) / post(v) are called when v is entered / finished,
+    tree_edge(v, w) right before w is entered from v, and
+    non_tree_edge(v, w) for each neighbor w of v that is already marked;
+    if non_tree_edge returns True the search stops at once and True is returned.
+    to maps an entry of adj[v] to a vertex, e.g. DirectedEdge.to.
+    the common bookkeeping is done inline, without a call per vertex:
+    edge_to[w] = v for every tree edge v-w, and ID[v] = label for every v entered.
+    returns the number of vertices entered otherwise
+    '''
+    marked[s] = True
+    if ID is not None:
+        ID[s] = label
+    if pre is not None:
+        pre(s)
+    entered = 1
+    path = [s]  # vertices on the current dfs path
+    stack = [iter(adj[s]) if to is None else map(to, adj[s])]  # their remaining neighbors
+    if pre is None and post is None and tree_edge is None and non_tree_edge is None:
+        # no hooks, the hot path of DFS and the components
+        if edge_to is None:
+            # nothing shows the visiting order, so a plain stack of vertices,
+            # marked when pushed, enters the same vertices at less cost
+            vertices = [s]
+            while vertices:
+                for w in adj[vertices.pop()] if to is None else map(to, adj[vertices.pop()]):
+                    if not marked[w]:
+                        marked[w] = True
+                        if ID is not None:
+                            ID[w] = label
+                        entered += 1
+                        vertices.append(w)
+            return entered
+        # the dfs path is walked back through edge_to[]
+        push = stack.append
+        v = s
+        while True:
+            for w in stack[-1]:
+                if not marked[w]:
+                    marked[w] = True
+                    edge_to[w] = v
+                    if ID is not None:
+                        ID[w] = label
+                    entered += 1
+                    push(iter(adj[w]) if to is None else map(to, adj[w]))
+                    v = w
+                    break
+            else:
+                stack.pop()
+                if not stack:
+                    return entered
+                v = edge_to[v]
+    while stack:
+        for w in stack[-1]:
+            if not marked[w]:
+                if edge_to is not None:
+                    edge_to[w] = path[-1]
+                if tree_edge is not None:
+                    tree_edge(path[-1], w)
+                marked[w] = True
+                entered += 1
+                if ID is not None:
+                    ID[w] = label
+                if pre is not None:
+                    pre(w)
+                path.append(w)
+                stack.append(iter(adj[w]) if to is None else map(to, adj[w]))
+                break
+            if non_tree_edge is not None and non_tree_edge(path[-1], w):
+                return True
+        else:
+            stack.pop()
+            v = path.pop()
+            if post is not None:
+                post(v)
+    return entered if non_tree_edge is None else False
 
 
 class DFS:
@@ -15,12 +104,7 @@ class DFS:
         mark v and visit all unmarked vertices adjacent to v
         in time proportional to the sum of the degrees of all vertices connected to s
         '''
-        self.marked[v] = True
-        for w in self.G.adj[v]:
-            if not self.marked[w]:
-                self.edge_to[w] = v
-                self.count += 1
-                self.dfs(w)
+        self.count += depth_first(self.G.adj, v, self.marked, edge_to=self.edge_to) - 1
 
     def has_path_to(self, v):
         return self.marked[v]
@@ -91,6 +175,93 @@ class BFS:
                 print(self.path_to(v))
 
 
+def _gather(np, offsets, targets, vertices):
+    '''
+    concatenated adjacency of the given vertices,
+    along with the vertex each entry belongs to
+    '''
+    starts = offsets[vertices]
+    counts = offsets[vertices + 1] - starts
+    owners = np.repeat(vertices, counts)
+    # position of each entry: its row start plus its rank within the row
+    shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return targets[shift + np.arange(len(owners))], owners
+
+
+class FrontierBFS:
+    '''
+    level-synchronous BFS expanding a whole frontier at a time with NumPy
+    over a CSR adjacency, from one source or a collection of sources.
+    with direction optimization, a level is expanded bottom-up (every unvisited
+    vertex looks for a parent in the frontier) once the frontier touches more
+    than 1/alpha of the unexplored edges, and top-down again once it holds
+    fewer than V/beta vertices.
+    dist_to[v] and edge_to[v] are NumPy arrays, with -1 for unreachable
+    vertices and for the sources' edge_to
+    '''
+    def __init__(self, G, sources, direction_optimizing=True, alpha=14, beta=24):
+        import numpy as np
+
+        if not isinstance(G, CSRGraph):
+            G = (CSRDigraph if isinstance(G, Digraph) else CSRGraph).from_graph(G)
+        self.G = G
+        V = G.V
+        offsets = np.frombuffer(G.offsets, dtype=np.int64)
+        targets = np.frombuffer(G.targets, dtype=np.int64)
+        degree = np.diff(offsets)
+        in_offsets, in_targets = offsets, targets
+        if direction_optimizing and G.directed:
+            # transpose: sort the edge tails by head
+            in_targets = np.repeat(np.arange(V), degree)[np.argsort(targets, kind='stable')]
+            in_offsets = np.zeros(V + 1, dtype=np.int64)
+            np.cumsum(np.bincount(targets, minlength=V), out=in_offsets[1:])
+
+        self.dist_to = np.full(V, -1, dtype=np.int64)
+        self.edge_to = np.full(V, -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64).reshape(-1))
+        self.sources = frontier
+        self.dist_to[frontier] = 0
+        in_frontier = np.zeros(V, dtype=bool)
+        unexplored = len(targets) - int(degree[frontier].sum())  # edges out of unvisited vertices
+        top_down = True
+        level = 0
+        while len(frontier):
+            if direction_optimizing:
+                if top_down and degree[frontier].sum() > unexplored / alpha:
+                    top_down = False
+                elif not top_down and len(frontier) < V / beta:
+                    top_down = True
+            if top_down:
+                w, v = _gather(np, offsets, targets, frontier)
+                fresh = self.dist_to[w] < 0
+                w, v = w[fresh], v[fresh]
+            else:
+                in_frontier[frontier] = True
+                v, w = _gather(np, in_offsets, in_targets, np.flatnonzero(self.dist_to < 0))
+                hit = in_frontier[v]
+                w, v = w[hit], v[hit]
+                in_frontier[frontier] = False
+            # keep the first parent found for every newly reached vertex
+            frontier, first = np.unique(w, return_index=True)
+            level += 1
+            self.dist_to[frontier] = level
+            self.edge_to[frontier] = v[first]
+            unexplored -= int(degree[frontier].sum())
+
+    def has_path_to(self, v):
+        return self.dist_to[v] >= 0
+
+    def path_to(self, v):
+        if not self.has_path_to(v):
+            return None
+        path = Stack()
+        while self.edge_to[v] >= 0:
+            path.push(v)
+            v = int(self.edge_to[v])
+        path.push(v)
+        return path
+
+
 class Cycle:
     def __init__(self, G):
         self.G = G
@@ -99,20 +270,24 @@ class Cycle:
         self.has_cycle = False
         for s in range(G.V):
             if not self.marked[s]:
-                self.dfs(s, s)
+                self.dfs(s)
 
-    def dfs(self, v, u):
+    def dfs(self, s):
         '''
-        the argument u indicates that dfs(v) is called in dfs(u)
+        a marked neighbor w of v other than the vertex u that v
+        was entered from closes a cycle
         '''
-        self.marked[v] = True
-        for w in self.G.adj[v]:
-            if not self.marked[w]:
-                self.edge_to[w] = v
-                self.dfs(w, v)
-            elif w != u:
+        def tree_edge(v, w):
+            self.edge_to[w] = v
+
+        def non_tree_edge(v, w):
+            u = s if v == s else self.edge_to[v]
+            if w != u:
                 self.has_cycle = True
-                return
+                return True
+            return False
+
+        depth_first(self.G.adj, s, self.marked, tree_edge=tree_edge, non_tree_edge=non_tree_edge)
 
 
 class DirectedCycle:
@@ -126,29 +301,36 @@ class DirectedCycle:
             if not self.marked[s]:
                 self.dfs(s)
 
-    def dfs(self, v):
-        self.on_stack[v] = True
-        self.marked[v] = True
-        for w in self.G.adj[v]:
-            if self.has_cycle():
-                return
-            if not self.marked[w]:
-                self.edge_to[w] = v
-                self.dfs(w)
-            elif self.on_stack[w]:
-                '''
-                if w is onstack, which means that it must be marked,
-                there must a directed path from w to v as we are now calling
-                function dfs(v). Hence, there is a directed cycle (w->v, v->w)
-                '''
-                x = v
-                while x != w:
-                    self.cycle.push(x)
-                    x = self.edge_to[x]
-                self.cycle.push(w)
-                self.cycle.push(v)
-        self.on_stack[v] = False
-        return
+    def dfs(self, s):
+        def pre(v):
+            self.on_stack[v] = True
+
+        def post(v):
+            self.on_stack[v] = False
+
+        def tree_edge(v, w):
+            self.edge_to[w] = v
+
+        def non_tree_edge(v, w):
+            if not self.on_stack[w]:
+                return False
+            '''
+            if w is onstack, which means that it must be marked,
+            there must a directed path from w to v as we are now
+            visiting v. Hence, there is a directed cycle (w->v, v->w)
+            '''
+            x = v
+            while x != w:
+                self.cycle.push(x)
+                x = self.edge_to[x]
+            self.cycle.push(w)
+            self.cycle.push(v)
+            return True
+
+        if self.has_cycle():
+            return
+        depth_first(self.G.adj, s, self.marked, pre=pre, post=post,
+                    tree_edge=tree_edge, non_tree_edge=non_tree_edge)
 
     def has_cycle(self):
         return not self.cycle.is_empty()
@@ -165,14 +347,12 @@ class DepthFirstOrder:
             if not self.marked[s]:
                 self.dfs(s)
 
-    def dfs(self, v):
-        self.pre.enqueue(v)
-        self.marked[v] = True
-        for w in self.G.adj[v]:
-            if not self.marked[w]:
-                self.dfs(w)
-        self.post.enqueue(v)
-        self.reverse_post.push(v)
+    def dfs(self, s):
+        def post(v):
+            self.post.enqueue(v)
+            self.reverse_post.push(v)
+
+        depth_first(self.G.adj, s, self.marked, pre=self.pre.enqueue, post=post)
 
 
 class TopologicalSort:
@@ -197,11 +377,101 @@ class ConnectedComponent:
                 self.count += 1
 
     def dfs(self, G, v):
-        self.marked[v] = True
-        self.ID[v] = self.count
-        for w in G.adj[v]:
-            if not self.marked[w]:
-                self.dfs(G, w)
+        depth_first(G.adj, v, self.marked, ID=self.ID, label=self.count)
+
+    def connected(self, v, w):
+        return self.ID[v] == self.ID[w]
+
+
+def _union_find_shard(args):
+    '''
+    union the edges v[i]-w[i] of one shard and return the resulting forest
+    as the parallel arrays (x, root) of the vertices that are not roots
+    '''
+    import numpy as np
+
+    V, v, w = args
+    uf = ArrayUnionFind(V)
+    uf.union_many(v, w)
+    uf.compress()
+    x = np.flatnonzero(uf.id != np.arange(V))
+    return x, uf.id[x]
+
+
+class ParallelConnectedComponent:
+    '''
+    connected components from the edge list instead of a dfs.
+    engine 'union-find' splits the edges into one shard per process, runs
+    an ArrayUnionFind over every shard in a multiprocessing pool and merges
+    the non-root entries of the partial forests with one more union_many;
+    engine 'label-propagation' lets every vertex take the
+    smallest label among its neighbors with NumPy until nothing changes.
+    components are numbered as in ConnectedComponent,
+    by order of their smallest vertex
+    '''
+    def __init__(self, G, processes=None, engine='union-find'):
+        import numpy as np
+
+        self.G = G
+        if engine == 'union-find':
+            labels = self._union_find(G, processes or os.cpu_count())
+        elif engine == 'label-propagation':
+            labels = self._label_propagation(G)
+        else:
+            raise ValueError(f"unknown engine {engine!r}")
+        # both engines label a component by its smallest vertex,
+        # so sorting the labels numbers the components by that vertex
+        roots, ID = np.unique(labels, return_inverse=True)
+        self.ID = ID.tolist()
+        self.count = len(roots)
+
+    def _edges(self, G):
+        '''
+        every undirected edge once, as parallel NumPy arrays
+        '''
+        import numpy as np
+
+        if isinstance(G, CSRGraph):
+            degrees = np.diff(np.frombuffer(G.offsets, dtype=np.int64))
+            w = np.frombuffer(G.targets, dtype=np.int64)
+        else:
+            degrees = np.fromiter(map(len, G.adj), dtype=np.int64, count=G.V)
+            w = np.fromiter(chain.from_iterable(G.adj), dtype=np.int64, count=int(degrees.sum()))
+        v = np.repeat(np.arange(G.V), degrees)
+        once = v < w
+        return v[once], w[once]
+
+    def _union_find(self, G, processes):
+        import numpy as np
+
+        v, w = self._edges(G)
+        size = -(-len(v) // processes) or 1
+        shards = [(G.V, v[i:i + size], w[i:i + size]) for i in range(0, len(v), size)]
+        if len(shards) > 1:
+            with Pool(len(shards)) as pool:
+                forests = pool.map(_union_find_shard, shards)
+        else:
+            forests = [_union_find_shard(shard) for shard in shards]
+        uf = ArrayUnionFind(G.V)
+        if forests:
+            uf.union_many(np.concatenate([x for x, _ in forests]),
+                          np.concatenate([root for _, root in forests]))
+        uf.compress()
+        return uf.id
+
+    def _label_propagation(self, G):
+        import numpy as np
+
+        v, w = self._edges(G)
+        labels = np.arange(G.V)
+        while True:
+            previous = labels
+            labels = labels.copy()
+            np.minimum.at(labels, v, labels[w])
+            np.minimum.at(labels, w, labels[v])
+            labels = labels[labels]  # pointer jumping
+            if np.array_equal(labels, previous):
+                return labels
 
     def connected(self, v, w):
         return self.ID[v] == self.ID[w]
@@ -220,11 +490,7 @@ class StronglyConnectedComponent:
                 self.count += 1
 
     def dfs(self, G, v):
-        self.marked[v] = True
-        self.ID[v] = self.count
-        for w in G.adj[v]:
-            if not self.marked[w]:
-                self.dfs(G, w)
+        depth_first(G.adj, v, self.marked, ID=self.ID, label=self.count)
 
     def connected(self, v, w):
         return self.ID[v] == self.ID[w]
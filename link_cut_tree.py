@@ -0,0 +1,172 @@
+class LinkCutTree:
+    '''
+    a forest of rooted trees under link and cut, every operation in amortized
+    O(log n). each tree is kept as preferred paths, one splay tree per path
+    ordered by depth, and a node's parent pointer leads either to its splay
+    tree parent or, from the root of a splay tree, to the path's parent node.
+    every node has a value, and path_max(u, v) finds the node of largest value
+    on the tree path between u and v
+    '''
+    def __init__(self, n=0):
+        self.left = []
+        self.right = []
+        self.parent = []
+        self.flip = []  # the children of the subtree are to be swapped
+        self.value = []
+        self.best = []  # node of largest value in the splay subtree
+        for _ in range(n):
+            self.add_node(float("-inf"))
+
+    def add_node(self, value):
+        '''
+        add a new single-node tree and return its index
+        '''
+        i = len(self.value)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.parent.append(-1)
+        self.flip.append(False)
+        self.value.append(value)
+        self.best.append(i)
+        return i
+
+    def reset_node(self, i, value):
+        '''
+        reuse node i, which must already be cut from every other node
+        '''
+        self.value[i] = value
+        self.best[i] = i
+
+    def _is_root(self, x):
+        '''
+        x is the root of its splay tree
+        '''
+        p = self.parent[x]
+        return p == -1 or (self.left[p] != x and self.right[p] != x)
+
+    def _push(self, x):
+        if self.flip[x]:
+            self.flip[x] = False
+            l = self.left[x]
+            r = self.right[x]
+            self.left[x] = r
+            self.right[x] = l
+            if l != -1:
+                self.flip[l] = not self.flip[l]
+            if r != -1:
+                self.flip[r] = not self.flip[r]
+
+    def _pull(self, x):
+        value = self.value
+        b = x
+        l = self.left[x]
+        r = self.right[x]
+        if l != -1 and value[self.best[l]] > value[b]:
+            b = self.best[l]
+        if r != -1 and value[self.best[r]] > value[b]:
+            b = self.best[r]
+        self.best[x] = b
+
+    def _rotate(self, x):
+        left, right, parent = self.left, self.right, self.parent
+        p = parent[x]
+        g = parent[p]
+        if not self._is_root(p):
+            if left[g] == p:
+                left[g] = x
+            else:
+                right[g] = x
+        parent[x] = g
+        if left[p] == x:
+            c = right[x]
+            left[p] = c
+            right[x] = p
+        else:
+            c = left[x]
+            right[p] = c
+            left[x] = p
+        if c != -1:
+            parent[c] = p
+        parent[p] = x
+        self._pull(p)
+        self._pull(x)
+
+    def _splay(self, x):
+        # push the pending flips down from the splay root first
+        path = [x]
+        y = x
+        while not self._is_root(y):
+            y = self.parent[y]
+            path.append(y)
+        for y in reversed(path):
+            self._push(y)
+        while not self._is_root(x):
+            p = self.parent[x]
+            if not self._is_root(p):
+                g = self.parent[p]
+                if (self.left[g] == p) == (self.left[p] == x):
+                    self._rotate(p)  # zig-zig
+                else:
+                    self._rotate(x)  # zig-zag
+            self._rotate(x)
+
+    def _access(self, x):
+        '''
+        make the path from the root to x preferred, x ends as its splay root
+        '''
+        last = -1
+        y = x
+        while y != -1:
+            self._splay(y)
+            self.right[y] = last
+            self._pull(y)
+            last = y
+            y = self.parent[y]
+        self._splay(x)
+
+    def _make_root(self, x):
+        self._access(x)
+        self.flip[x] = not self.flip[x]
+
+    def find_root(self, x):
+        self._access(x)
+        self._push(x)
+        while self.left[x] != -1:
+            x = self.left[x]
+            self._push(x)
+        self._splay(x)
+        return x
+
+    def connected(self, u, v):
+        return u == v or self.find_root(u) == self.find_root(v)
+
+    def link(self, u, v):
+        '''
+        add the edge u-v, u and v must be in different trees
+        '''
+        if self.connected(u, v):
+            raise ValueError(f"{u} and {v} are already connected")
+        self._make_root(u)
+        self.parent[u] = v
+
+    def cut(self, u, v):
+        '''
+        remove the edge u-v, which must be in the forest
+        '''
+        self._make_root(u)
+        self._access(v)
+        if self.left[v] != u or self.left[u] != -1 or self.right[u] != -1:
+            raise ValueError(f"no edge between {u} and {v}")
+        self.left[v] = -1
+        self.parent[u] = -1
+        self._pull(v)
+
+    def path_max(self, u, v):
+        '''
+        the node of largest value on the path between u and v, which must be connected
+        '''
+        if not self.connected(u, v):
+            raise ValueError(f"{u} and {v} are not connected")
+        self._make_root(u)
+        self._access(v)
+        return self.best[v]
@@ -1,21 +1,228 @@
+from contextlib import closing, ExitStack
+from itertools import islice
+from multiprocessing import Pool
+from operator import itemgetter
+import heapq
+import os
+import struct
+import tempfile
+
 from stack_queue import Queue, PriorityQueueMin, IndexPriorityQueueMin
 from union_find import UnionFind
+from link_cut_tree import LinkCutTree
+from graph import Edge, EdgeWeightedGraph, edge_arrays
 
 
 class KruskalMST:
-    def __init__(self, G):
+    '''
+    Kruskal's MST algorithm, stopping once V-1 edges are in the mst.
+    engine 'heap' takes the edges from G.sorted_edges() or a PriorityQueueMin;
+    engine 'argsort' orders the edge arrays of G with one NumPy argsort;
+    engine 'filter' is Filter-Kruskal: the edges are split around a pivot weight
+    and the heavier part is only sorted after dropping the edges inside the
+    components built from the lighter part, parts of at most threshold
+    edges are sorted directly
+    '''
+    def __init__(self, G, engine='heap', threshold=4096):
         self.mst = Queue()
-        pq = PriorityQueueMin()
         uf = UnionFind(G.V)
-        for e in G.edges():
-            pq.insert(e)
-        while not pq.is_empty() and self.mst.N < G.V - 1:
-            e = pq.del_min()
-            v = e.either()
-            w = e.other(v)
-            if not uf.connected(v, w):
-                uf.union(v, w)
-                self.mst.enqueue(e)
+        if engine == 'heap':
+            self._heap(G, uf)
+        elif engine == 'argsort':
+            self._argsort(G, uf)
+        elif engine == 'filter':
+            self._filter(G, uf, threshold)
+        else:
+            raise ValueError(f"unknown engine {engine!r}")
+
+    def _heap(self, G, uf):
+        if hasattr(G, 'sorted_edges'):
+            # the graph caches its sorted edges, so repeated runs skip the sort
+            edges = iter(G.sorted_edges())
+        else:
+            pq = PriorityQueueMin()
+            for e in G.edges():
+                pq.insert(e)
+            edges = (pq.del_min() for _ in range(pq.size()))
+        for e in edges:
+            if self.mst.N >= G.V - 1:
+                break
+            self._add(e, uf)
+
+    def _add(self, e, uf):
+        v = e.either()
+        w = e.other(v)
+        if not uf.connected(v, w):
+            uf.union(v, w)
+            self.mst.enqueue(e)
+
+    def _scan(self, G, uf, v, w, ids, edge):
+        '''
+        add the edges ids, in order, whose ends are not connected yet
+        '''
+        for p, q, i in zip(v[ids].tolist(), w[ids].tolist(), ids.tolist()):
+            if self.mst.N >= G.V - 1:
+                return
+            if not uf.connected(p, q):
+                uf.union(p, q)
+                self.mst.enqueue(edge(i))
+
+    def _arrays(self, G):
+        import numpy as np
+
+        v, w, weight = edge_arrays(G)
+        edge = _edge_lookup(G, v, w, weight)
+        return (np.asarray(v, dtype=np.int64), np.asarray(w, dtype=np.int64),
+                np.asarray(weight, dtype=float), edge)
+
+    def _argsort(self, G, uf):
+        import numpy as np
+
+        v, w, weight, edge = self._arrays(G)
+        self._scan(G, uf, v, w, np.argsort(weight, kind='stable'), edge)
+
+    def _filter(self, G, uf, threshold):
+        import numpy as np
+
+        v, w, weight, edge = self._arrays(G)
+        # parts still to do, lightest on top, with the mst size when they were split off
+        parts = [(np.arange(len(v)), 0)]
+        while parts and self.mst.N < G.V - 1:
+            ids, N = parts.pop()
+            if self.mst.N > N:
+                # drop the edges inside the components found since
+                ends = np.unique(np.concatenate([v[ids], w[ids]]))
+                root = np.empty(G.V, dtype=np.int64)
+                root[ends] = [uf.find(x) for x in ends.tolist()]
+                ids = ids[root[v[ids]] != root[w[ids]]]
+            if len(ids) == 0:
+                continue
+            if len(ids) <= threshold:
+                self._scan(G, uf, v, w, ids[np.argsort(weight[ids], kind='stable')], edge)
+                continue
+            pivot = np.median(weight[ids])
+            light = weight[ids] <= pivot
+            if light.all():
+                self._scan(G, uf, v, w, ids[np.argsort(weight[ids], kind='stable')], edge)
+                continue
+            parts.append((ids[~light], self.mst.N))
+            parts.append((ids[light], self.mst.N))
+
+    def edges(self):
+        return self.mst
+
+    def weight(self):
+        return sum([x.weight for x in self.mst.tolist()])
+
+
+class ExternalKruskalMST:
+    '''
+    Kruskal's MST algorithm for an edge file too large for memory, only the
+    UnionFind over the V vertices, the mst and a buffer of buffer_edges edges
+    are held at once. the edges are read in chunks of buffer_edges, every chunk
+    is sorted by weight and written to a temporary run file, and the runs are
+    merged lazily into one stream in ascending order of weight.
+    the edge file has one edge per line, "v w weight", or with binary=True
+    packed records of RECORD (int64 v, int64 w, float64 weight).
+    a minimum spanning forest if the graph is not connected
+    '''
+    RECORD = struct.Struct('=qqd')
+
+    def __init__(self, path, V, buffer_edges=1 << 20, binary=False, sep=None, tmpdir=None, fan_in=64):
+        '''
+        at most fan_in run files are open and merged at once; with more runs,
+        groups of fan_in runs are first merged into longer runs, pass after
+        pass, until no more than fan_in are left
+        '''
+        if buffer_edges < 1:
+            raise ValueError("buffer_edges must be positive")
+        if fan_in < 2:
+            raise ValueError("fan_in must be at least 2")
+        self.mst = Queue()
+        uf = UnionFind(V)
+        # each open run keeps only one block of records in memory
+        block = max(1, buffer_edges // fan_in)
+        with tempfile.TemporaryDirectory(dir=tmpdir) as runs_dir:
+            runs = []
+            for chunk in self._chunks(path, buffer_edges, binary, sep):
+                chunk.sort(key=itemgetter(2))
+                runs.append(self._write_run(runs_dir, len(runs), chunk))
+                del chunk
+            n = len(runs)
+            while len(runs) > fan_in:
+                merged = []
+                for i in range(0, len(runs), fan_in):
+                    group = runs[i:i + fan_in]
+                    if len(group) == 1:
+                        merged.append(group[0])
+                        continue
+                    with closing(self._merge(group, block)) as records:
+                        merged.append(self._write_run(runs_dir, n, records))
+                    n += 1
+                    for run in group:
+                        os.remove(run)
+                runs = merged
+            with closing(self._merge(runs, block)) as records:
+                for v, w, weight in records:
+                    if self.mst.N >= V - 1:
+                        break
+                    if not uf.connected(v, w):
+                        uf.union(v, w)
+                        self.mst.enqueue(Edge(v, w, weight))
+
+    def _write_run(self, runs_dir, n, records):
+        '''
+        write the (v, w, weight) of an iterable to a new run file and return its path
+        '''
+        run = os.path.join(runs_dir, f'run{n}')
+        records = iter(records)
+        with open(run, 'wb') as f:
+            while True:
+                batch = b''.join(self.RECORD.pack(*x) for x in islice(records, 4096))
+                if not batch:
+                    return run
+                f.write(batch)
+
+    def _merge(self, runs, block):
+        '''
+        the records of the run files in ascending order of weight
+        '''
+        with ExitStack() as stack:
+            files = [stack.enter_context(open(run, 'rb')) for run in runs]
+            yield from heapq.merge(*(self._records(f, block) for f in files), key=itemgetter(2))
+
+    def _chunks(self, path, buffer_edges, binary, sep):
+        '''
+        the edges of the file as lists of at most buffer_edges (v, w, weight)
+        '''
+        if binary:
+            with open(path, 'rb') as f:
+                yield from iter(lambda: list(self._unpack(f.read(buffer_edges * self.RECORD.size))), [])
+            return
+        chunk = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                fields = line.split(sep)
+                chunk.append((int(fields[0]), int(fields[1]), float(fields[2])))
+                if len(chunk) == buffer_edges:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def _unpack(self, data):
+        if len(data) % self.RECORD.size:
+            raise ValueError("truncated edge record")
+        return self.RECORD.iter_unpack(data)
+
+    def _records(self, f, block):
+        while True:
+            data = f.read(block * self.RECORD.size)
+            if not data:
+                return
+            yield from self._unpack(data)
 
     def edges(self):
         return self.mst
@@ -65,11 +272,13 @@ class PrimLazyMst:
 
 class PrimEagerMst:
     '''
-    eager version of Prim's MST algorithm
+    eager version of Prim's MST algorithm,
+    pq_class(max_n) builds the index priority queue, any of the ones in stack_queue
+    whose keys may be edges
     '''
-    def __init__(self, G):
+    def __init__(self, G, pq_class=IndexPriorityQueueMin):
         self.mst = Queue()  # mst edges
-        pq = IndexPriorityQueueMin(G.V)  # eligible crossing edges
+        pq = pq_class(G.V)  # eligible crossing edges
         marked = [False] * G.V  # mst vertices
         marked[0] = True
         for e in G.adj[0]:
@@ -97,3 +306,176 @@ class PrimEagerMst:
 
     def weight(self):
         return sum([x.weight for x in self.mst.tolist()])
+
+
+def _edge_lookup(G, v, w, weight):
+    '''
+    i -> the i-th edge of G.edges(), given the edge arrays of G; the
+    edge objects of G itself where it keeps them, fresh ones otherwise
+    '''
+    if hasattr(G, 'store'):
+        return G.store.__getitem__
+    if isinstance(G, EdgeWeightedGraph):
+        return list(G.edges()).__getitem__
+    edge = getattr(G, 'edge_class', Edge)
+    return lambda i: edge(int(v[i]), int(w[i]), float(weight[i]))
+
+
+def _cheapest(args):
+    '''
+    the cheapest edge at every component among the edge ends of one shard,
+    with ties broken by edge id so the chosen edges never close a cycle;
+    returns the components, their cheapest weights and edge ids
+    '''
+    import numpy as np
+
+    n, c, weight, ids = args
+    best = np.full(n, np.inf)
+    np.minimum.at(best, c, weight)
+    tie = weight == best[c]
+    first = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(first, c[tie], ids[tie])
+    comps = np.flatnonzero(first != np.iinfo(np.int64).max)
+    return comps, best[comps], first[comps]
+
+
+class BoruvkaMST:
+    '''
+    Boruvka's MST algorithm over the edge arrays of G: every round finds the
+    cheapest edge leaving each component, adds them all to the mst and
+    contracts the components with a UnionFind, so there are at most lg V
+    rounds. engine 'vectorized' finds the cheapest edges with NumPy in one
+    pass; engine 'parallel' splits the edges into one shard per process and
+    merges the per-shard minima. edges between vertices of the same component
+    are dropped after each round. a minimum spanning forest if G is not connected
+    '''
+    def __init__(self, G, engine='vectorized', processes=None):
+        import numpy as np
+
+        if engine not in ('vectorized', 'parallel'):
+            raise ValueError(f"unknown engine {engine!r}")
+        self.mst = Queue()
+        v, w, weight = edge_arrays(G)
+        edge = _edge_lookup(G, v, w, weight)
+        v = np.asarray(v, dtype=np.int64)
+        w = np.asarray(w, dtype=np.int64)
+        weight = np.asarray(weight, dtype=float)
+        ids = np.arange(len(v))
+        comp = np.arange(G.V)  # component of every vertex, named by its root in uf
+        uf = UnionFind(G.V)
+        pool = None
+        if engine == 'parallel':
+            processes = processes or os.cpu_count()
+            if processes > 1:
+                pool = Pool(processes)
+        try:
+            while True:
+                cv = comp[v]
+                cw = comp[w]
+                keep = cv != cw
+                if not keep.all():
+                    v, w, weight, ids = v[keep], w[keep], weight[keep], ids[keep]
+                    cv, cw = cv[keep], cw[keep]
+                if len(ids) == 0:
+                    break
+                comps, _, chosen = self._round(G.V, cv, cw, weight, ids, pool, processes)
+                for c, i in zip(comps.tolist(), chosen.tolist()):
+                    e = edge(i)
+                    x = e.either()
+                    y = e.other(x)
+                    if not uf.connected(x, y):
+                        uf.union(x, y)
+                        self.mst.enqueue(e)
+                roots = np.unique(comp)
+                lookup = np.empty(G.V, dtype=np.int64)
+                lookup[roots] = [uf.find(r) for r in roots.tolist()]
+                comp = lookup[comp]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def _round(self, V, cv, cw, weight, ids, pool, processes):
+        import numpy as np
+
+        c = np.concatenate([cv, cw])
+        weight = np.concatenate([weight, weight])
+        ids = np.concatenate([ids, ids])
+        if pool is None:
+            return _cheapest((V, c, weight, ids))
+        size = -(-len(c) // processes)
+        shards = [(V, c[i:i + size], weight[i:i + size], ids[i:i + size]) for i in range(0, len(c), size)]
+        parts = pool.map(_cheapest, shards)
+        return _cheapest((V, *(np.concatenate(x) for x in zip(*parts))))
+
+    def edges(self):
+        return self.mst
+
+    def weight(self):
+        return sum([x.weight for x in self.mst.tolist()])
+
+
+class DynamicMST:
+    '''
+    minimum spanning forest of G kept up to date while edges are added
+    through add_edge() of this class. the forest is held in a LinkCutTree
+    where every tree edge is a node of its own, valued by its weight, between
+    its two vertices; a new edge v-w either joins two trees or closes a cycle,
+    and then it replaces the heaviest edge on the tree path from v to w if it
+    is lighter. every insertion costs amortized O(log V)
+    '''
+    def __init__(self, G):
+        self.G = G
+        self.lct = LinkCutTree(G.V)  # nodes 0..V-1 are the vertices
+        self.tree = {}  # node -> tree edge
+        self.free = []  # edge nodes to reuse
+        for e in KruskalMST(G).edges().tolist():
+            self._link(e)
+
+    def add_edge(self, e):
+        '''
+        add e to G and return the edge that left the forest, e itself if it
+        did not enter, or None if e joined two trees
+        '''
+        self.G.add_edge(e)
+        v = e.either()
+        w = e.other(v)
+        if v == w:
+            return e
+        if not self.lct.connected(v, w):
+            self._link(e)
+            return None
+        x = self.lct.path_max(v, w)
+        heaviest = self.tree[x]
+        if not e.weight < heaviest.weight:
+            return e
+        self._cut(x)
+        self._link(e)
+        return heaviest
+
+    def _link(self, e):
+        if self.free:
+            x = self.free.pop()
+            self.lct.reset_node(x, e.weight)
+        else:
+            x = self.lct.add_node(e.weight)
+        v = e.either()
+        self.lct.link(x, v)
+        self.lct.link(x, e.other(v))
+        self.tree[x] = e
+
+    def _cut(self, x):
+        e = self.tree.pop(x)
+        v = e.either()
+        self.lct.cut(x, v)
+        self.lct.cut(x, e.other(v))
+        self.free.append(x)
+
+    def edges(self):
+        mst = Queue()
+        for e in self.tree.values():
+            mst.enqueue(e)
+        return mst
+
+    def weight(self):
+        return sum([x.weight for x in self.tree.values()])
@@ -1,5 +1,17 @@
-from stack_queue import Stack, IndexPriorityQueueMin
-from graph import DirectedEdge, EdgeWeightedDigraph
+from array import array
+from collections import OrderedDict
+from operator import attrgetter
+from multiprocessing import Pool
+from numbers import Integral
+import heapq
+import os
+import struct
+import tempfile
+
+from stack_queue import Stack, Queue, IndexPriorityQueueMin
+from graph import DirectedEdge, EdgeWeightedDigraph, CSREdgeWeightedDigraph, edge_arrays
+from graph_io import save_graph, open_graph
+from graph_utils import depth_first
 
 
 class ShortestPath:
@@ -66,12 +78,38 @@ class ShortestPath:
 
 
 class DijkstraSP(ShortestPath):
-    def __init__(self, G, s):
+    def __init__(self, G, s, targets=None, radius=None, k=None, pq_class=IndexPriorityQueueMin):
+        '''
+        the search can stop early, once all of targets (a vertex or a collection,
+        an empty one sets no limit) are settled, once the next vertex is farther
+        than radius, or once k vertices are settled; dist_to[] and edge_to[] are
+        then final for the vertices in settled and only upper bounds for the others.
+        pq_class(max_n) builds the index priority queue, any of the ones in stack_queue
+        '''
         super().__init__(G, s)
-        self.pq = IndexPriorityQueueMin(G.V)
+        self.pq = pq_class(G.V)
+        self._search(G, s, targets, radius, k)
+
+    def _search(self, G, s, targets, radius, k):
+        self.settled = []  # vertices in the order they were taken off the pq
+        if targets is None:
+            left = None
+        elif isinstance(targets, Integral):
+            left = {targets}
+        else:
+            left = set(targets) or None  # no targets, no limit
         self.pq.insert(s, 0.)
         while not self.pq.is_empty():
+            if radius is not None and self.pq.min_key() > radius:
+                break
             v = self.pq.del_min()
+            self.settled.append(v)
+            if left is not None:
+                left.discard(v)
+                if not left:
+                    break
+            if k is not None and len(self.settled) >= k:
+                break
             for e in G.adj[v]:
                 self._relax(e)
 
@@ -91,6 +129,792 @@ class DijkstraSP(ShortestPath):
                 self.pq.insert(w, self.dist_to[w])
 
 
+class DijkstraSearch(DijkstraSP):
+    '''
+    DijkstraSP set up once for G and then run from one source after another,
+    each run only resets the entries touched by the previous one, which makes
+    bounded searches cost in proportion to the part of G they explore
+    '''
+    def __init__(self, G, pq_class=IndexPriorityQueueMin):
+        self.G = G
+        self.dist_to = [float("inf")] * G.V
+        self.edge_to = [None] * G.V
+        self.pq = pq_class(G.V)
+        self.touched = []
+        self.settled = []
+
+    def run(self, s, targets=None, radius=None, k=None):
+        for v in self.touched:
+            self.dist_to[v] = float("inf")
+            self.edge_to[v] = None
+        while not self.pq.is_empty():
+            self.pq.del_min()
+        self.touched = [s]
+        self.dist_to[s] = 0.
+        self._search(self.G, s, targets, radius, k)
+        return self
+
+    def _relax(self, e):
+        if self.dist_to[e.to()] == float("inf"):
+            self.touched.append(e.to())
+        super()._relax(e)
+
+
+class _TreeEdges:
+    '''
+    edge_to[] of a CompactSPT, materializing the DirectedEdges on demand
+    '''
+    def __init__(self, parent, weight):
+        self.parent = parent
+        self.weight = weight
+
+    def __getitem__(self, v):
+        if self.parent[v] == -1:
+            return None
+        return DirectedEdge(self.parent[v], v, self.weight[v])
+
+    def __len__(self):
+        return len(self.parent)
+
+
+class CompactSPT(ShortestPath):
+    '''
+    finished shortest-path tree in flat arrays: dist_to[] plus the tail
+    and the weight of edge_to[v] for every v (-1 as tail when there is none)
+    '''
+    def __init__(self, sp):
+        self.dist_to = array('d', sp.dist_to)
+        self.parent = array('q', [-1 if e is None else e.from_() for e in sp.edge_to])
+        self.weight = array('d', [0. if e is None else e.weight for e in sp.edge_to])
+        self.edge_to = _TreeEdges(self.parent, self.weight)
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.dist_to, self.parent, self.weight))
+
+
+class ShortestPathCache:
+    '''
+    LRU cache of the shortest-path trees of G, kept as CompactSPTs.
+    entries belong to one G.version, which every change to G bumps, so an
+    update drops them all; the least recently used trees are evicted once
+    the cache holds more than max_bytes
+    '''
+    def __init__(self, G, max_bytes=64 * 2**20, sp_class=DijkstraSP):
+        self.G = G
+        self.max_bytes = max_bytes
+        self.sp_class = sp_class
+        self.trees = OrderedDict()  # (version, s) -> tree, least recently used first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, s):
+        key = (self.G.version, s)
+        tree = self.trees.get(key)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(key)
+            return tree
+        self.misses += 1
+        if self.trees and next(iter(self.trees))[0] != self.G.version:
+            self.clear()
+        tree = CompactSPT(self.sp_class(self.G, s))
+        self.trees[key] = tree
+        self.nbytes += tree.nbytes()
+        while self.nbytes > self.max_bytes and len(self.trees) > 1:
+            _, old = self.trees.popitem(last=False)
+            self.nbytes -= old.nbytes()
+        return tree
+
+    def clear(self):
+        self.trees.clear()
+        self.nbytes = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+
+class DynamicSP(ShortestPath):
+    '''
+    shortest paths from s kept up to date while G changes through
+    add_edge(), set_weight() and remove_edge() of this class.
+    an edge that gets cheaper can only shorten paths, which a Dijkstra search
+    seeded at its head repairs; an edge of the tree that gets dearer or goes
+    away can only lengthen the paths through it, so only the subtree below it
+    is recomputed, starting from the best edges into it from the rest of the tree
+    '''
+    def __init__(self, G, s):
+        sp = DijkstraSP(G, s)
+        self.G = G
+        self.s = s
+        self.dist_to = sp.dist_to
+        self.edge_to = sp.edge_to
+
+    def add_edge(self, e):
+        self.G.add_edge(e)
+        self._decreased(e)
+
+    def set_weight(self, e, weight):
+        old = e.weight
+        self.G.set_weight(e, weight)
+        if weight < old:
+            self._decreased(e)
+        elif weight > old and self._in_tree(e, old):
+            self._repair(e.to())
+
+    def remove_edge(self, e):
+        weight = e.weight
+        self.G.remove_edge(e)
+        if self._in_tree(e, weight):
+            self._repair(e.to())
+
+    def _in_tree(self, e, weight):
+        '''
+        whether e, of the given weight, is the tree edge into e.to(); compared by
+        value, as graphs like CompactEdgeWeightedDigraph hand out copies of their edges
+        '''
+        x = self.edge_to[e.to()]
+        return x is e or (x is not None and x.from_() == e.from_() and x.weight == weight)
+
+    def _decreased(self, e):
+        v = e.from_()
+        w = e.to()
+        if self.dist_to[v] + e.weight < self.dist_to[w]:
+            self.dist_to[w] = self.dist_to[v] + e.weight
+            self.edge_to[w] = e
+            self._dijkstra([w])
+
+    def _repair(self, w):
+        '''
+        recompute the subtree of the shortest-path tree rooted at w
+        '''
+        subtree = {w}
+        stack = [w]
+        while stack:
+            v = stack.pop()
+            for e in self.G.adj[v]:
+                x = e.to()
+                tree_edge = self.edge_to[x]
+                if tree_edge is not None and tree_edge.from_() == v and x not in subtree:
+                    subtree.add(x)
+                    stack.append(x)
+        for v in subtree:
+            self.dist_to[v] = float("inf")
+            self.edge_to[v] = None
+        radj = self.G.reverse_adj()
+        for v in subtree:
+            for e in radj[v]:
+                u = e.from_()
+                if u not in subtree and self.dist_to[u] + e.weight < self.dist_to[v]:
+                    self.dist_to[v] = self.dist_to[u] + e.weight
+                    self.edge_to[v] = e
+        self._dijkstra([v for v in subtree if self.dist_to[v] < float("inf")])
+
+    def _dijkstra(self, sources):
+        '''
+        settle outwards from vertices whose distance just dropped, touching
+        only the vertices whose distance drops in turn
+        '''
+        pq = [(self.dist_to[v], v) for v in sources]
+        heapq.heapify(pq)
+        while pq:
+            d, v = heapq.heappop(pq)
+            if d > self.dist_to[v]:
+                continue
+            for e in self.G.adj[v]:
+                w = e.to()
+                if d + e.weight < self.dist_to[w]:
+                    self.dist_to[w] = d + e.weight
+                    self.edge_to[w] = e
+                    heapq.heappush(pq, (d + e.weight, w))
+
+
+class BidirectionalDijkstraSP:
+    '''
+    point-to-point shortest path from s to t, running a forward search from s
+    and a backward search from t over the reverse adjacency, each step settling
+    a vertex on the side with the smaller queue; once the two minimum keys add
+    up to at least the best s-t distance seen so far, no shorter path is left
+    '''
+    def __init__(self, G, s, t):
+        self.s = s
+        self.t = t
+        self.dist = float("inf")
+        self.meet = None  # vertex where the two halves of the best path join
+        self.dist_to = [float("inf")] * G.V  # forward distances from s
+        self.dist_from = [float("inf")] * G.V  # backward distances to t
+        self.edge_to = [None] * G.V
+        self.edge_from = [None] * G.V
+        self.dist_to[s] = 0.
+        self.dist_from[t] = 0.
+        if s == t:
+            self.dist = 0.
+            self.meet = s
+            return
+        radj = G.reverse_adj()
+        self.pq = IndexPriorityQueueMin(G.V)
+        self.pq_back = IndexPriorityQueueMin(G.V)
+        self.pq.insert(s, 0.)
+        self.pq_back.insert(t, 0.)
+        while not self.pq.is_empty() and not self.pq_back.is_empty():
+            if self.pq.min_key() + self.pq_back.min_key() >= self.dist:
+                break
+            if self.pq.size() <= self.pq_back.size():
+                v = self.pq.del_min()
+                for e in G.adj[v]:
+                    self._relax(e, v, e.to(), self.dist_to, self.edge_to, self.pq, self.dist_from)
+            else:
+                v = self.pq_back.del_min()
+                for e in radj[v]:
+                    self._relax(e, v, e.from_(), self.dist_from, self.edge_from, self.pq_back, self.dist_to)
+
+    def _relax(self, e, v, w, dist, edge, pq, other):
+        '''
+        relax edge e from v towards w in one search, where dist / edge / pq belong
+        to that search and other holds the distances of the opposite search
+        '''
+        d = dist[v] + e.weight
+        if dist[w] > d:
+            dist[w] = d
+            edge[w] = e
+            if pq.contains(w):
+                pq.decrease_key(w, d)
+            else:
+                pq.insert(w, d)
+        if d + other[w] < self.dist:
+            self.dist = d + other[w]
+            self.meet = w
+
+    def has_path_to(self, v):
+        self._check_target(v)
+        return self.dist < float("inf")
+
+    def path_to(self, v):
+        '''
+        the edges of the path from s to t, the first one on top as in ShortestPath
+        '''
+        if not self.has_path_to(v):
+            return None
+        path = Stack()
+        x = self.meet
+        while x != self.t:
+            e = self.edge_from[x]
+            path.push(e)
+            x = e.to()
+        edges = path.tolist()  # meet -> t, last edge first
+        path = Stack()
+        for e in edges:
+            path.push(e)
+        e = self.edge_to[self.meet]
+        while e is not None:
+            path.push(e)
+            e = self.edge_to[e.from_()]
+        return path
+
+    def _check_target(self, v):
+        if v != self.t:
+            raise ValueError(f"only the path to the target {self.t} is known, not to {v}")
+
+
+class AStarSP(ShortestPath):
+    '''
+    goal-directed Dijkstra from s to t, vertices come off the pq in order of
+    dist_to[v] + heuristic(v). the heuristic must be a lower bound on the distance
+    from v to t that drops by at most e.weight along any edge e (consistent),
+    so that t is final as soon as it is settled and the search stops there.
+    with the zero heuristic this is DijkstraSP stopped at t
+    '''
+    def __init__(self, G, s, t, heuristic=None):
+        super().__init__(G, s)
+        self.t = t
+        self.heuristic = heuristic if heuristic is not None else (lambda v: 0.)
+        self.n_settled = 0  # number of vertices taken off the pq
+        self.pq = IndexPriorityQueueMin(G.V)
+        self.pq.insert(s, self.heuristic(s))
+        while not self.pq.is_empty():
+            v = self.pq.del_min()
+            self.n_settled += 1
+            if v == t:
+                break
+            for e in G.adj[v]:
+                self._relax(e)
+
+    def _relax(self, e):
+        v = e.from_()
+        w = e.to()
+        if self.dist_to[w] > self.dist_to[v] + e.weight:
+            first = self.dist_to[w] == float("inf")
+            self.dist_to[w] = self.dist_to[v] + e.weight
+            self.edge_to[w] = e
+            h = self.heuristic(w)
+            if h == float("inf"):
+                return  # t is not reachable from w
+            # a consistent heuristic never reopens a settled vertex
+            if first:
+                self.pq.insert(w, self.dist_to[w] + h)
+            elif self.pq.contains(w):
+                self.pq.decrease_key(w, self.dist_to[w] + h)
+
+
+class Landmarks:
+    '''
+    ALT preprocessing: exact distances from and to a few landmark vertices L,
+    chosen one after the other as far as possible from the ones already picked.
+    by the triangle inequality d(v, t) >= d(L, t) - d(L, v) and
+    d(v, t) >= d(v, L) - d(t, L), and the best of these bounds is a consistent
+    heuristic for AStarSP
+    '''
+    _HEADER = struct.Struct('=qq')
+
+    def __init__(self, G=None, k=8, landmarks=None):
+        self.landmarks = []
+        self.dist_from = []  # dist_from[i][v] = d(landmarks[i], v)
+        self.dist_to = []  # dist_to[i][v] = d(v, landmarks[i])
+        if G is None:
+            return
+        if landmarks is not None:
+            for L in landmarks:
+                self._add(G, L)
+            return
+        # the first landmark is the vertex farthest from 0, every next one
+        # the vertex farthest from all the landmarks picked so far
+        nearest = DijkstraSP(G, 0).dist_to if G.V else []
+        for _ in range(min(k, G.V)):
+            L = max((v for v in range(G.V) if v not in self.landmarks),
+                    key=lambda v: nearest[v] if nearest[v] < float("inf") else -1.)
+            self._add(G, L)
+            if len(self.landmarks) == 1:
+                nearest = self.dist_from[0]
+            else:
+                nearest = list(map(min, nearest, self.dist_from[-1]))
+
+    def _add(self, G, L):
+        self.landmarks.append(L)
+        self.dist_from.append(array('d', DijkstraSP(G, L).dist_to))
+        self.dist_to.append(self._backward(G, L))
+
+    def _backward(self, G, L):
+        '''
+        d(v, L) for every v, by a Dijkstra search from L over G.reverse_adj()
+        '''
+        radj = G.reverse_adj()
+        dist = array('d', [float("inf")]) * G.V
+        dist[L] = 0.
+        pq = [(0., L)]
+        while pq:
+            d, w = heapq.heappop(pq)
+            if d > dist[w]:
+                continue
+            for e in radj[w]:
+                v = e.from_()
+                if d + e.weight < dist[v]:
+                    dist[v] = d + e.weight
+                    heapq.heappush(pq, (d + e.weight, v))
+        return dist
+
+    def heuristic(self, t):
+        '''
+        lower bound on the distance to t as a function of v;
+        undefined inf - inf terms are left out
+        '''
+        from_to_t = [d[t] for d in self.dist_from]
+        t_to = [d[t] for d in self.dist_to]
+        tables = list(zip(self.dist_from, from_to_t, self.dist_to, t_to))
+
+        def h(v):
+            best = 0.
+            for dist_from, Lt, dist_to, tL in tables:
+                for bound in (Lt - dist_from[v], dist_to[v] - tL):
+                    if bound > best:  # False for nan
+                        best = bound
+            return best
+        return h
+
+    def save(self, path):
+        V = len(self.dist_from[0]) if self.landmarks else 0
+        with open(path, 'wb') as f:
+            f.write(self._HEADER.pack(len(self.landmarks), V))
+            array('q', self.landmarks).tofile(f)
+            for d in self.dist_from + self.dist_to:
+                d.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        lm = cls()
+        with open(path, 'rb') as f:
+            k, V = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            landmarks = array('q')
+            landmarks.fromfile(f, k)
+            lm.landmarks = landmarks.tolist()
+            for tables in (lm.dist_from, lm.dist_to):
+                for _ in range(k):
+                    d = array('d')
+                    d.fromfile(f, V)
+                    tables.append(d)
+        return lm
+
+
+class ALTSP(AStarSP):
+    '''
+    A* search guided by landmark bounds
+    '''
+    def __init__(self, G, s, t, landmarks):
+        super().__init__(G, s, t, landmarks.heuristic(t))
+
+
+class _DistanceWorker:
+    '''
+    one-to-many Dijkstra over the flat arrays of a CSR digraph, keeping its
+    dist_to[] and heap between sources and resetting only the entries it touched.
+    with predecessors, run() also returns the vertex before each target on its path
+    '''
+    def __init__(self, G, targets, predecessors=False):
+        self.offsets = G.offsets
+        self.targets = G.targets
+        self.weights = G.weights
+        self.dist_to = [float("inf")] * G.V
+        self.pred_to = [-1] * G.V if predecessors else None
+        self.touched = []
+        self.pq = []
+        self.wanted = targets
+
+    def run(self, s):
+        dist_to = self.dist_to
+        pred_to = self.pred_to
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        pq = self.pq
+        left = set(self.wanted)  # targets not settled yet
+        dist_to[s] = 0.
+        self.touched.append(s)
+        pq.append((0., s))
+        while pq and left:
+            d, v = heapq.heappop(pq)
+            if d > dist_to[v]:
+                continue
+            left.discard(v)
+            for i in range(offsets[v], offsets[v + 1]):
+                w = targets[i]
+                if d + weights[i] < dist_to[w]:
+                    if dist_to[w] == float("inf"):
+                        self.touched.append(w)
+                    dist_to[w] = d + weights[i]
+                    if pred_to is not None:
+                        pred_to[w] = v
+                    heapq.heappush(pq, (d + weights[i], w))
+        row = array('d', [dist_to[t] for t in self.wanted])
+        if pred_to is not None:
+            row = (row, array('q', [pred_to[t] for t in self.wanted]))
+            for v in self.touched:
+                pred_to[v] = -1
+        for v in self.touched:
+            dist_to[v] = float("inf")
+        self.touched.clear()
+        pq.clear()
+        return row
+
+
+_worker = None
+
+
+def _init_distance_worker(path, targets, predecessors):
+    global _worker
+    _worker = _DistanceWorker(open_graph(path), targets, predecessors)
+
+
+def _distance_row(s):
+    return _worker.run(s)
+
+
+def distance_matrix(G, sources, targets, processes=None, predecessors=False):
+    '''
+    NumPy matrix of the shortest-path distances from every source to every target.
+    the sources are spread over a pool of processes that all map one read-only
+    CSR copy of G from disk (G's own file if it came from graph_io.open_graph).
+    with predecessors, also return the matrix of the vertex before each target
+    on its path from each source, -1 for none
+    '''
+    import numpy as np
+
+    sources = list(sources)
+    targets = list(targets)
+    path = getattr(G, 'path', None)
+    if path is None:
+        if not isinstance(G, CSREdgeWeightedDigraph):
+            G = CSREdgeWeightedDigraph.from_graph(G)
+        fd, path = tempfile.mkstemp(suffix='.csr')
+        os.close(fd)
+        save_graph(G, path)
+        temporary = True
+    else:
+        temporary = False
+    try:
+        if processes == 1:
+            worker = _DistanceWorker(open_graph(path), targets, predecessors)
+            rows = [worker.run(s) for s in sources]
+        else:
+            processes = processes or os.cpu_count()
+            chunksize = max(1, len(sources) // (4 * processes))
+            with Pool(processes, initializer=_init_distance_worker, initargs=(path, targets, predecessors)) as pool:
+                rows = pool.map(_distance_row, sources, chunksize)
+    finally:
+        if temporary:
+            os.remove(path)
+    matrix = np.empty((len(sources), len(targets)))
+    if not predecessors:
+        for i, row in enumerate(rows):
+            matrix[i] = np.frombuffer(row)
+        return matrix
+    pred = np.empty((len(sources), len(targets)), dtype=np.int64)
+    for i, (row, prow) in enumerate(rows):
+        matrix[i] = np.frombuffer(row)
+        pred[i] = np.frombuffer(prow, dtype=np.int64)
+    return matrix, pred
+
+
+def _spt_cycle(edge_to):
+    '''
+    a cycle of the shortest-path tree edges, as a list of edges in path order,
+    or None; each vertex has at most one tree edge into it, so walking the
+    tree edges backwards from every vertex finds all cycles
+    '''
+    state = [0] * len(edge_to)  # 0 unvisited, 1 on the current walk, 2 done
+    for s in range(len(edge_to)):
+        walk = []
+        v = s
+        while state[v] == 0 and edge_to[v] is not None:
+            state[v] = 1
+            walk.append(v)
+            v = edge_to[v].from_()
+        if state[v] == 1:
+            cycle = []
+            x = v
+            while True:
+                e = edge_to[x]
+                cycle.append(e)
+                x = e.from_()
+                if x == v:
+                    break
+            cycle.reverse()
+            return cycle
+        for x in walk:
+            state[x] = 2
+        state[v] = 2
+    return None
+
+
+class BellmanFordSP(ShortestPath):
+    '''
+    shortest paths from s with arbitrary edge weights.
+    engine 'vectorized' relaxes every edge at once with NumPy over the edge
+    arrays of G, one round after another until a round changes nothing;
+    a change in round V means a negative cycle.
+    engine 'queue' only relaxes the edges out of vertices whose distance
+    changed, checking the tree for a cycle after every V relaxations
+    '''
+    def __init__(self, G, s, engine='vectorized'):
+        super().__init__(G, s)
+        self.cycle = None
+        if engine == 'vectorized':
+            self._vectorized(G, s)
+        elif engine == 'queue':
+            self._queue(G, s)
+        else:
+            raise ValueError(f"unknown engine {engine!r}")
+
+    def _vectorized(self, G, s):
+        import numpy as np
+
+        v, w, weight = (np.asarray(a) for a in edge_arrays(G))
+        if isinstance(G, EdgeWeightedDigraph) and not hasattr(G, 'store'):
+            edges = list(G.edges())
+        else:
+            edges = None
+        dist = np.array(self.dist_to)
+        pred = np.full(G.V, -1, dtype=np.int64)  # id of edge_to[v]
+        rounds = 0
+        while True:
+            candidate = dist[v] + weight
+            better = np.flatnonzero(candidate < dist[w])
+            if len(better) == 0:
+                break
+            rounds += 1
+            np.minimum.at(dist, w[better], candidate[better])
+            # one edge achieving the new distance of each vertex
+            best = better[candidate[better] == dist[w[better]]]
+            heads, first = np.unique(w[best], return_index=True)
+            pred[heads] = best[first]
+            if rounds >= G.V:
+                self._set_tree(G, dist, pred, v, w, weight, edges)
+                self.cycle = _spt_cycle(self.edge_to)
+                if self.cycle is not None:
+                    return
+        self._set_tree(G, dist, pred, v, w, weight, edges)
+
+    def _set_tree(self, G, dist, pred, v, w, weight, edges):
+        self.dist_to = dist.tolist()
+        for x, i in enumerate(pred.tolist()):
+            if i == -1:
+                self.edge_to[x] = None
+            elif edges is not None:
+                self.edge_to[x] = edges[i]
+            else:
+                self.edge_to[x] = DirectedEdge(int(v[i]), int(w[i]), float(weight[i]))
+
+    def _queue(self, G, s):
+        queue = Queue()
+        on_queue = [False] * G.V
+        queue.enqueue(s)
+        on_queue[s] = True
+        relaxations = 0
+        while not queue.is_empty() and self.cycle is None:
+            v = queue.dequeue()
+            on_queue[v] = False
+            for e in G.adj[v]:
+                w = e.to()
+                if self.dist_to[w] > self.dist_to[v] + e.weight:
+                    self.dist_to[w] = self.dist_to[v] + e.weight
+                    self.edge_to[w] = e
+                    if not on_queue[w]:
+                        queue.enqueue(w)
+                        on_queue[w] = True
+                relaxations += 1
+                if relaxations % G.V == 0:
+                    self.cycle = _spt_cycle(self.edge_to)
+                    if self.cycle is not None:
+                        return
+
+    def has_negative_cycle(self):
+        return self.cycle is not None
+
+    def negative_cycle(self):
+        '''
+        the edges of a negative cycle reachable from s, in order from the top
+        '''
+        if self.cycle is None:
+            return None
+        cycle = Stack()
+        for e in reversed(self.cycle):
+            cycle.push(e)
+        return cycle
+
+
+class AllPairsSP:
+    '''
+    shortest paths between every pair of vertices of an EdgeWeightedDigraph,
+    as the NumPy matrices dist_to[s, t] and pred_to[s, t], the vertex before t
+    on the path from s (-1 for none).
+    mode 'floyd-warshall' vectorizes each step k over blocks of rows with
+    NumPy broadcasting, O(V^3) arithmetic but no Python loop over pairs;
+    mode 'johnson' makes the weights non-negative with the potentials of
+    one BellmanFordSP from an extra vertex, then runs the V Dijkstra passes
+    in parallel through distance_matrix; it is the faster one on sparse graphs.
+    mode 'auto' picks Floyd-Warshall once E reaches density * V^2
+    '''
+    def __init__(self, G, mode='auto', processes=None, block=256, density=0.05):
+        self.G = G
+        self.V = G.V
+        self.cycle = False
+        if mode == 'auto':
+            mode = 'floyd-warshall' if G.E >= density * G.V * G.V else 'johnson'
+        if mode == 'floyd-warshall':
+            self._floyd_warshall(G, block)
+        elif mode == 'johnson':
+            self._johnson(G, processes)
+        else:
+            raise ValueError(f"unknown mode {mode!r}")
+        self.mode = mode
+
+    def _floyd_warshall(self, G, block):
+        import numpy as np
+
+        V = G.V
+        v, w, weight = (np.asarray(a) for a in edge_arrays(G))
+        dist = np.full((V, V), float("inf"))
+        np.fill_diagonal(dist, 0.)
+        np.minimum.at(dist, (v, w), weight)
+        pred = np.full((V, V), -1, dtype=np.int64)
+        rows, cols = np.nonzero(np.isfinite(dist))
+        pred[rows, cols] = rows
+        pred[np.arange(V), np.arange(V)] = -1
+        block = max(1, min(block, V))
+        candidate = np.empty((block, V))
+        better = np.empty((block, V), dtype=bool)
+        for k in range(V):
+            # row and column k do not change in step k unless dist[k, k] < 0
+            through = dist[k]
+            pred_k = np.broadcast_to(pred[k], (block, V))
+            for lo in range(0, V, block):
+                hi = min(lo + block, V)
+                n = hi - lo
+                np.add(dist[lo:hi, k, None], through, out=candidate[:n])
+                np.less(candidate[:n], dist[lo:hi], out=better[:n])
+                np.copyto(dist[lo:hi], candidate[:n], where=better[:n])
+                np.copyto(pred[lo:hi], pred_k[:n], where=better[:n])
+            if dist[k, k] < 0:
+                self.cycle = True
+                break
+        self.dist_to = dist
+        self.pred_to = pred
+
+    def _johnson(self, G, processes):
+        import numpy as np
+
+        V = G.V
+        v, w, weight = edge_arrays(G)
+        v = np.asarray(v, dtype=np.int64)
+        w = np.asarray(w, dtype=np.int64)
+        weight = np.asarray(weight, dtype=float)
+        if len(weight) and weight.min() < 0:
+            # potentials: distances from an extra vertex V with 0-weight edges to all
+            H = CSREdgeWeightedDigraph.from_edges(
+                V + 1, np.concatenate([v, np.full(V, V)]), np.concatenate([w, np.arange(V)]),
+                np.concatenate([weight, np.zeros(V)]))
+            bf = BellmanFordSP(H, V)
+            if bf.has_negative_cycle():
+                self.cycle = True
+                self.dist_to = np.full((V, V), float("nan"))
+                self.pred_to = np.full((V, V), -1, dtype=np.int64)
+                return
+            h = np.array(bf.dist_to[:V])
+            # clip the rounding error that could make a tight edge negative
+            weight = np.maximum(weight + h[v] - h[w], 0.)
+        else:
+            h = np.zeros(V)
+        R = CSREdgeWeightedDigraph.from_edges(V, v, w, weight)
+        dist, pred = distance_matrix(R, range(V), range(V), processes, predecessors=True)
+        self.dist_to = dist - h[:, None] + h[None, :]
+        self.pred_to = pred
+
+    def has_negative_cycle(self):
+        '''
+        dist_to and pred_to are meaningless when G has a negative cycle
+        '''
+        return self.cycle
+
+    def dist(self, s, t):
+        return float(self.dist_to[s, t])
+
+    def has_path_to(self, s, t):
+        return bool(self.dist_to[s, t] < float("inf"))
+
+    def path_to(self, s, t):
+        '''
+        the edges of G on the path from s to t, the first one on top
+        '''
+        if self.cycle:
+            raise RuntimeError("negative cycle in the graph")
+        if not self.has_path_to(s, t):
+            return None
+        path = Stack()
+        x = t
+        while x != s:
+            u = int(self.pred_to[s, x])
+            path.push(min((e for e in self.G.adj[u] if e.to() == x), key=attrgetter('weight')))
+            x = u
+        return path
+
+
 class AcyclicSP(ShortestPath):
     def __init__(self, G, s):
         super().__init__(G, s)
@@ -117,12 +941,7 @@ class AcyclicSP(ShortestPath):
         return order.tolist()
 
     def _dfs(self, G, v, marked, order):
-        marked[v] = True
-        for e in G.adj[v]:
-            w = e.to()
-            if not marked[w]:
-                self._dfs(G, w, marked, order)
-        order.push(v)
+        depth_first(G.adj, v, marked, post=order.push, to=DirectedEdge.to)
 
 
 class AcyclicLP:
@@ -153,12 +972,7 @@ class AcyclicLP:
         return order.tolist()
 
     def _dfs(self, G, v, marked, order):
-        marked[v] = True
-        for e in G.adj[v]:
-            w = e.to()
-            if not marked[w]:
-                self._dfs(G, w, marked, order)
-        order.push(v)
+        depth_first(G.adj, v, marked, post=order.push, to=DirectedEdge.to)
 
     def has_path_to(self, v):
         return self.dist_to[v] > float("-inf") and self.edge_to[v] is not None
@@ -1,3 +1,6 @@
+import heapq
+
+
 class Node:
     def __init__(self, item, next=None):
         self.item = item
@@ -340,3 +343,227 @@ class IndexPriorityQueueMin:
         # to maintain the inverse relation
         self.qp[self.pq[i]] = i
         self.qp[self.pq[j]] = j
+
+
+class IndexDaryPriorityQueueMin(IndexPriorityQueueMin):
+    '''
+    IndexPriorityQueueMin on a d-ary heap, which is shallower than the binary
+    heap: inserts and decrease_key, the bulk of the work in Dijkstra, swim
+    through fewer levels, while del_min compares more children per level
+    '''
+    def __init__(self, max_n, d=4):
+        super().__init__(max_n)
+        self.d = d
+
+    def _swim(self, k):
+        d = self.d
+        while k > 1:
+            parent = (k - 2) // d + 1
+            if not self._greater(parent, k):
+                break
+            self._exch(parent, k)
+            k = parent
+
+    def _sink(self, k):
+        d = self.d
+        while True:
+            first = d * (k - 1) + 2  # children of k are first ... first + d - 1
+            if first > self.N:
+                break
+            j = first
+            for c in range(first + 1, min(first + d, self.N + 1)):
+                if self._greater(j, c):
+                    j = c
+            if not self._greater(k, j):
+                break
+            self._exch(k, j)
+            k = j
+
+
+class LazyIndexPriorityQueueMin:
+    '''
+    index priority queue on top of heapq: a key change pushes a new entry and
+    leaves the old one in the heap, to be skipped when it comes up.
+    ties are broken by insertion order, so keys are never compared for equality
+    '''
+    def __init__(self, max_n):
+        self.heap = []  # entries [key, count, i], i is -1 for stale ones
+        self.entry = [None] * max_n  # live entry of each key index
+        self.keys = [None] * max_n
+        self.count = 0
+        self.N = 0
+
+    def insert(self, i, key):
+        if self.contains(i):
+            raise ValueError(f"key index {i} is already in the priority queue")
+        self.N += 1
+        self._push(i, key)
+
+    def _push(self, i, key):
+        self.count += 1
+        entry = [key, self.count, i]
+        self.entry[i] = entry
+        self.keys[i] = key
+        heapq.heappush(self.heap, entry)
+
+    def _prune(self):
+        '''
+        drop the stale entries from the top of the heap
+        '''
+        while self.heap[0][2] == -1:
+            heapq.heappop(self.heap)
+
+    def del_min(self, return_key=False):
+        if self.N == 0:
+            raise RuntimeError("The priority queue is empty")
+        self._prune()
+        key, _, i = heapq.heappop(self.heap)
+        self.N -= 1
+        self.entry[i] = None
+        self.keys[i] = None
+        if return_key:
+            return i, key
+        return i
+
+    def change_key(self, i, key):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        self.entry[i][2] = -1
+        self._push(i, key)
+
+    def decrease_key(self, i, key):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        if key == self.keys[i]:
+            raise ValueError("Calling decrease_key() with a key equal to the key in the priority queue")
+        elif key > self.keys[i]:
+            raise ValueError("Calling decrease_key() with a key strictly greater than the key in the priority queue")
+        self.change_key(i, key)
+
+    def increase_key(self, i, key):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        if key == self.keys[i]:
+            raise ValueError("Calling increase_key() with a key equal to the key in the priority queue")
+        elif key < self.keys[i]:
+            raise ValueError("Calling increase_key() with a key strictly less than the key in the priority queue")
+        self.change_key(i, key)
+
+    def delete(self, i):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        self.entry[i][2] = -1
+        self.entry[i] = None
+        self.keys[i] = None
+        self.N -= 1
+
+    def min_key(self):
+        if self.N == 0:
+            raise RuntimeError("The priority queue is empty")
+        self._prune()
+        return self.heap[0][0]
+
+    def min_index(self):
+        if self.N == 0:
+            raise RuntimeError("The priority queue is empty")
+        self._prune()
+        return self.heap[0][2]
+
+    def contains(self, i):
+        return self.entry[i] is not None
+
+    def size(self):
+        return self.N
+
+    def is_empty(self):
+        return self.N == 0
+
+
+class BucketIndexPriorityQueueMin:
+    '''
+    radix / bucket queue of Dial's algorithm for non-negative integer keys
+    that never drop below the last minimum removed and never exceed it by
+    more than C, e.g. Dijkstra distances with integer weights at most C:
+    a circular array of C + 1 buckets, bucket k % (C + 1) holding key k
+    '''
+    def __init__(self, max_n, C):
+        self.C = C
+        self.buckets = [set() for _ in range(C + 1)]
+        self.keys = [None] * max_n
+        self.current = 0  # no key below it is left
+        self.N = 0
+
+    def insert(self, i, key):
+        if self.contains(i):
+            raise ValueError(f"key index {i} is already in the priority queue")
+        if self.N == 0 and key < self.current:
+            self.current = int(key)  # an emptied queue may be reused from a lower key
+        self._check(key)
+        self.keys[i] = key
+        self.buckets[int(key) % (self.C + 1)].add(i)
+        self.N += 1
+
+    def _check(self, key):
+        if key != int(key) or not self.current <= key <= self.current + self.C:
+            raise ValueError(f"key {key} is not an integer in [{self.current}, {self.current + self.C}]")
+
+    def _advance(self):
+        '''
+        move current up to the smallest key left
+        '''
+        while not self.buckets[self.current % (self.C + 1)]:
+            self.current += 1
+
+    def del_min(self, return_key=False):
+        if self.N == 0:
+            raise RuntimeError("The priority queue is empty")
+        self._advance()
+        i = self.buckets[self.current % (self.C + 1)].pop()
+        key = self.keys[i]
+        self.keys[i] = None
+        self.N -= 1
+        if return_key:
+            return i, key
+        return i
+
+    def change_key(self, i, key):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        self._check(key)
+        self.buckets[int(self.keys[i]) % (self.C + 1)].remove(i)
+        self.keys[i] = key
+        self.buckets[int(key) % (self.C + 1)].add(i)
+
+    def decrease_key(self, i, key):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        if key == self.keys[i]:
+            raise ValueError("Calling decrease_key() with a key equal to the key in the priority queue")
+        elif key > self.keys[i]:
+            raise ValueError("Calling decrease_key() with a key strictly greater than the key in the priority queue")
+        self.change_key(i, key)
+
+    def delete(self, i):
+        if not self.contains(i):
+            raise ValueError(f"key index {i} is not in the priority queue")
+        self.buckets[int(self.keys[i]) % (self.C + 1)].remove(i)
+        self.keys[i] = None
+        self.N -= 1
+
+    def min_key(self):
+        return self.keys[self.min_index()]
+
+    def min_index(self):
+        if self.N == 0:
+            raise RuntimeError("The priority queue is empty")
+        self._advance()
+        return next(iter(self.buckets[self.current % (self.C + 1)]))
+
+    def contains(self, i):
+        return self.keys[i] is not None
+
+    def size(self):
+        return self.N
+
+    def is_empty(self):
+        return self.N == 0
@@ -2,7 +2,7 @@ class UnionFind:
     def __init__(self, n):
         self.id = list(range(n))
         self.sz = [1] * n
-        self.count = n
+        self._count = n
 
     def find(self, i):
         return self.root(i)
@@ -24,10 +24,117 @@ class UnionFind:
         else:
             self.id[j] = i
             self.sz[i] += self.sz[j]
-        self.count -= 1
+        self._count -= 1
 
     def connected(self, p, q):
         return self.root(p) == self.root(q)
 
     def count(self):
-        return self.count
+        return self._count
+
+
+class ArrayUnionFind:
+    '''
+    union-find over a NumPy parent array, taking whole arrays of pairs at once.
+    a root is always hooked under a smaller root, so parents only decrease,
+    no cycle can form when many roots are hooked in one vectorized step, and
+    the root of every set is its smallest element.
+    find_many() compresses the paths of the elements it looks up,
+    compress() points every element straight at its root
+    '''
+    def __init__(self, n):
+        import numpy as np
+
+        self.id = np.arange(n, dtype=np.int64)
+        self._count = n
+
+    def find_many(self, x):
+        '''
+        the roots of the elements of x, as an array
+        '''
+        import numpy as np
+
+        x = np.asarray(x, dtype=np.int64)
+        root = self.id[x]
+        while True:
+            up = self.id[root]
+            if np.array_equal(up, root):
+                break
+            up = self.id[up]
+            # path halving, when the elements cover a long path this halves
+            # all of it at once and the walk takes O(log) steps, not O(length)
+            self.id[root] = up
+            root = up
+        self.id[x] = root
+        return root
+
+    def union_many(self, p, q):
+        '''
+        union p[i] and q[i] for every i
+        '''
+        import numpy as np
+
+        p = np.asarray(p, dtype=np.int64)
+        q = np.asarray(q, dtype=np.int64)
+        while len(p):
+            i = self.find_many(p)
+            j = self.find_many(q)
+            apart = i != j
+            if not apart.any():
+                break
+            p, q, i, j = p[apart], q[apart], i[apart], j[apart]
+            high = np.maximum(i, j)
+            # every high root gets hooked, under the smallest root paired with it
+            np.minimum.at(self.id, high, np.minimum(i, j))
+            if len(high) * 8 < len(self.id):
+                self._count -= len(np.unique(high))
+            else:
+                # same count, a mark per element is cheaper than sorting a batch this big
+                hooked = np.zeros(len(self.id), dtype=bool)
+                hooked[high] = True
+                self._count -= int(np.count_nonzero(hooked))
+            if len(p) * 8 >= len(self.id):
+                self.compress()  # cheaper than long paths for a big batch
+
+    def connected_many(self, p, q):
+        '''
+        boolean array, whether p[i] and q[i] are in the same set
+        '''
+        return self.find_many(p) == self.find_many(q)
+
+    def compress(self):
+        '''
+        full path compression, afterwards id[x] is the root of x for every x
+        '''
+        import numpy as np
+
+        while True:
+            up = self.id[self.id]
+            if np.array_equal(up, self.id):
+                return
+            self.id = up
+
+    def component_labels(self):
+        '''
+        the set of every element, numbered 0..count()-1 by order of their
+        smallest element, as in graph_utils.ConnectedComponent
+        '''
+        import numpy as np
+
+        self.compress()
+        return np.searchsorted(np.unique(self.id), self.id)
+
+    def find(self, i):
+        return int(self.find_many([i])[0])
+
+    def root(self, i):
+        return self.find(i)
+
+    def union(self, p, q):
+        self.union_many([p], [q])
+
+    def connected(self, p, q):
+        return self.find(p) == self.find(q)
+
+    def count(self):
+        return self._count